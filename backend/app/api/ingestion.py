@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException
+from typing import List
+
+from app.schema.schemas import IngestionJob, IngestionJobRequest
+from app.services.ingestion_jobs import ingestion_runner, job_from_row
+
+router = APIRouter(
+    prefix="/ingestion",
+    tags=["ingestion"]
+)
+
+# Plain `def` routes: FastAPI runs them in its threadpool, so the blocking supabase calls don't hold up the event loop.
+# The ingestion itself happens on the runner's background thread, never in a request.
+
+# ***** Start a background ingestion job *****
+@router.post("/jobs", response_model=IngestionJob, status_code=202)
+def create_job(payload: IngestionJobRequest):
+    try:
+        row = ingestion_runner.submit(payload.sources)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job_from_row(row)
+
+# ***** All jobs, newest first *****
+@router.get("/jobs", response_model=List[IngestionJob])
+def list_jobs():
+    return [job_from_row(row) for row in ingestion_runner.list()]
+
+# ***** One job: status, checkpoint, throughput, ETA *****
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+def get_job(job_id: str):
+    row = ingestion_runner.get(job_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_from_row(row)
+
+# ***** Retry a failed job from its last checkpoint *****
+@router.post("/jobs/{job_id}/resume", response_model=IngestionJob, status_code=202)
+def resume_job(job_id: str):
+    row = ingestion_runner.resume(job_id)
+    if row is None:
+        raise HTTPException(status_code=409, detail="Only failed jobs can be resumed")
+    return job_from_row(row)
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, FastAPI
-from datetime import datetime
-from typing import List
+from fastapi import APIRouter, HTTPException, FastAPI, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta
+from typing import List, Optional, Literal
 from app.services.llm_service import llm_service
+from app.services.session_export import iter_export_lines, gzip_chunks
+from app.services.upstream_governor import UpstreamOverloaded, UpstreamTimeout
 
 # Importing schemas
 from app.schema.schemas import (
@@ -10,7 +13,13 @@ from app.schema.schemas import (
     AnswerRequest,
     AnswerResponse,
     generate_id,
-    SessionSummary
+    SessionSummary,
+    BulkCreateRequest,
+    BulkDeleteRequest,
+    BulkSessionResult,
+    BulkSessionResponse,
+    session_rows_to_json,
+    session_summary_rows_to_json,
 )
 
 # Importing supabase client
@@ -29,6 +38,14 @@ def get_llm_feedback(user_answer: str) -> str:
         "Right now it's just a placeholder so your frontend can talk to something."
     )
 
+# ********** Helpers **********
+
+def delete_sessions_by_id(session_ids: List[str]) -> set[str]:
+    # Deletes the sessions and all of their messages in a single call, returns the ids that existed.
+    # The function returns one text[] value rather than a row per id, so max-rows can't truncate it.
+    result = supabase.rpc("delete_chat_sessions", {"session_ids": session_ids}).execute()
+    return set(result.data or [])
+
 # ********** Routes **********
 
 # ***** Menu of all sessions *****
@@ -44,17 +61,12 @@ async def list_sessions():
         .execute()
     )
 
-    # If there are no sessions yet, just return an empty list
-    if not result.data:
-        return []
-
-    return [
-        SessionSummary(
-            id=row["id"], # Iterate through all ids to return a list of all sessions in SessionSummary format
-            createdAt=row["created_at"],
-        )
-        for row in result.data
-    ]
+    # Validate the raw rows once and serialize them straight to JSON bytes.
+    # Returning a Response skips FastAPI's second validation pass; response_model is kept for the docs.
+    return Response(
+        content=session_summary_rows_to_json(result.data or []), # No sessions yet -> "[]"
+        media_type="application/json",
+    )
 
 # ***** Create a new session *****
 @router.post("/", response_model=SessionSummary, status_code=201)
@@ -89,6 +101,87 @@ async def create_session():
         createdAt=session_row["created_at"],
     )
 
+# ***** Create many sessions at once *****
+# One insert for the whole batch instead of one POST per session
+@router.post("/bulk", response_model=BulkSessionResponse, status_code=201)
+async def bulk_create_sessions(payload: BulkCreateRequest):
+    new_ids = [generate_id("sess") for _ in range(payload.count)]
+
+    try:
+        result = (
+            supabase
+            .table("chat_sessions")
+            .insert([{"id": session_id} for session_id in new_ids])
+            .execute()
+        )
+    except Exception as e:
+        # One insert statement, so either every row was created or none were
+        print(f"Bulk create of {len(new_ids)} sessions failed: {e}")
+        return BulkSessionResponse(
+            results=[BulkSessionResult(id=session_id, status=500, detail="Failed to create session") for session_id in new_ids]
+        )
+
+    # Report each id individually, same as create_session would have (201 created / 500 failed)
+    created = {row["id"]: row["created_at"] for row in (result.data or [])}
+    return BulkSessionResponse(
+        results=[
+            BulkSessionResult(id=session_id, status=201, createdAt=created[session_id])
+            if session_id in created
+            else BulkSessionResult(id=session_id, status=500, detail="Failed to create session")
+            for session_id in new_ids
+        ]
+    )
+
+# ***** Delete many sessions at once *****
+# A single call to the delete_chat_sessions SQL function (data/sql/delete_chat_sessions.sql)
+# removes the messages and sessions for every id, so retention jobs don't need one request per session.
+@router.post("/bulk-delete", response_model=BulkSessionResponse)
+async def bulk_delete_sessions(payload: BulkDeleteRequest):
+    requested = list(dict.fromkeys(payload.ids)) # De-duplicate, keep order
+
+    try:
+        deleted = delete_sessions_by_id(requested)
+    except Exception as e:
+        print(f"Bulk delete of {len(requested)} sessions failed: {e}")
+        # The function runs in one transaction, so either everything was deleted or nothing was
+        return BulkSessionResponse(
+            results=[BulkSessionResult(id=session_id, status=500, detail="Failed to delete session") for session_id in requested]
+        )
+
+    return BulkSessionResponse(
+        results=[
+            BulkSessionResult(id=session_id, status=200)
+            if session_id in deleted
+            else BulkSessionResult(id=session_id, status=404, detail="Session not found")
+            for session_id in requested
+        ]
+    )
+
+# ***** Export all sessions + transcripts for audit *****
+# Streams NDJSON (one session line, then its messages) page by page, so memory stays flat.
+# Must be declared before /{session_id} or "export" would be treated as a session id.
+@router.get("/export")
+def export_sessions(
+    start: Optional[datetime] = None,  # only sessions created at or after this time
+    end: Optional[datetime] = None,    # only sessions created before this time
+    format: Literal["ndjson", "gzip"] = "ndjson",
+):
+    # Sync generator: Starlette iterates it in the threadpool, so the blocking supabase calls don't stall other requests
+    chunks = iter_export_lines(start, end)
+    filename = "sessions_export.ndjson"
+    media_type = "application/x-ndjson"
+
+    if format == "gzip":
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # ***** Get a specific chat session and all of its messages *****
 @router.get("/{session_id}", response_model=Session)
 async def get_session(session_id: str):
@@ -115,25 +208,15 @@ async def get_session(session_id: str):
         .select("*")                     # Take all columns 
         .eq("session_id", session_id)    # Grab the specific session 
         .order("created_at", desc=False) # Sort oldest to newset 
+        .order("role", desc=True)        # Older turns share one timestamp: user answer before the feedback
         .execute()
     )
 
-    # Converting the database rows into pydantic models (because there was initially some descrepincy)
-    messages = [
-        Message(
-            id=m["id"],
-            role=m["role"],
-            content=m["content"],
-            createdAt=m["created_at"],
-        )
-        for m in messages_result.data
-    ]
-
-    # need to return some supabase version
-    return Session(
-        id=session_row["id"],
-        createdAt=session_row["created_at"],
-        messages=messages # The array from above of the properly converted pydantic schema messages 
+    # Validate the database rows straight into the Session schema (created_at -> createdAt) and dump to JSON in one pass.
+    # Long transcripts were spending most of their time being rebuilt as Message objects and then re-validated by FastAPI.
+    return Response(
+        content=session_rows_to_json(session_row, messages_result.data or []),
+        media_type="application/json",
     )
 
 # ***** UserInput and Chatbot response *****
@@ -141,8 +224,10 @@ async def get_session(session_id: str):
 # - Generate LLM feedback
 # - Store feedback as assistant message
 # - Return both messages
+# Plain def on purpose: FastAPI runs it in the threadpool. The Gemini calls block (governor slot waits,
+# retry backoff, the request itself), and inside an async def they would stall every other request.
 @router.post("/{session_id}/answer", response_model=AnswerResponse)
-async def post_answer(session_id: str, payload: AnswerRequest):
+def post_answer(session_id: str, payload: AnswerRequest):
     # (A) Confirm the session exists
     session_result = (
         supabase
@@ -164,6 +249,7 @@ async def post_answer(session_id: str, payload: AnswerRequest):
         .select("role, content")
         .eq("session_id", session_id)
         .order("created_at", desc=False)  # oldest first
+        .order("role", desc=True)         # same-timestamp turns: user before assistant
         .execute()
     )
     
@@ -184,17 +270,30 @@ async def post_answer(session_id: str, payload: AnswerRequest):
     )
 
     # (C) The LLM Feedback (with conversation history)
-    feedback_text = llm_service.generate_reply(
-        user_input=user_msg.content,
-        past_messages=past_messages,
-    )
+    # Gemini calls are governed (see upstream_governor): surface overload/timeouts as clear errors, nothing is saved
+    try:
+        feedback_text = llm_service.generate_reply(
+            user_input=user_msg.content,
+            past_messages=past_messages,
+            sources=payload.sources,
+            session_id=session_id,
+        )
+    except UpstreamOverloaded:
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant is busy right now, please try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    except UpstreamTimeout:
+        raise HTTPException(status_code=504, detail="The assistant took too long to respond, please try again")
 
     # (D) Assistant feedback message
+    # Stamped when the reply arrived (and always after the user message) so transcripts sort in turn order
     assistant_msg = Message(
         id=generate_id("msg_assistant"),
         role="assistant",
         content=feedback_text, # Taken directly from the LLM feedback,
-        createdAt=now
+        createdAt=max(datetime.now(), now + timedelta(microseconds=1))
     )
 
     # (E) Save user and assistant messages to database
@@ -229,33 +328,16 @@ async def post_answer(session_id: str, payload: AnswerRequest):
 
 @router.delete("/{session_id}")
 async def delete_session(session_id : str):
-    # First, verify the session exists
-    session_check = (
-        supabase
-        .table("chat_sessions")
-        .select("id")
-        .eq("id", session_id)
-        .execute()
-    )
-    
-    if not session_check.data:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Delete all messages associated with this session first (to avoid foreign key constraint)
-    supabase.table("chat_messages").delete().eq("session_id", session_id).execute()
-    
-    # Now delete the session itself
-    result = (
-        supabase
-        .table("chat_sessions")
-        .delete()
-        .eq("id", session_id)
-        .execute()
-    )
-    
-    # If no rows were deleted, something went wrong
-    if not result.data:
+    # One round trip: the SQL function deletes the messages (foreign key) and then the session,
+    # and only returns the id if the session actually existed
+    try:
+        deleted = delete_sessions_by_id([session_id])
+    except Exception as e:
+        print(f"Delete of session {session_id} failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete session")
+
+    if session_id not in deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
     return
 
 # PATCH /api/chat_sessions/{id} → rename a session. Still Need to implement this!! After POC
\ No newline at end of file
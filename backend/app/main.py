@@ -5,9 +5,19 @@ from datetime import datetime, timezone
 
 from .api.items import router as items_router
 from .api.sessions import router as sessions_router
+from .api.ingestion import router as ingestion_router
+from .services.ingestion_jobs import ingestion_runner
+
+# Start the background ingestion worker with the app (it resumes any unfinished jobs),
+# and let it checkpoint and stop cleanly on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ingestion_runner.start()
+    yield
+    ingestion_runner.stop()
 
 # FastAPI connection point
-app = FastAPI(title="CIBC Controling Testing App") # Literally takes the lifespan context manager def from above
+app = FastAPI(title="CIBC Controling Testing App", lifespan=lifespan) # Literally takes the lifespan context manager def from above
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +30,7 @@ app.add_middleware(
 # Include your API routes under /api
 app.include_router(items_router, prefix="/api")
 app.include_router(sessions_router, prefix="/api")
+app.include_router(ingestion_router, prefix="/api")
 
 # Potential landing page
 @app.get("/")
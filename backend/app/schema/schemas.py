@@ -1,11 +1,16 @@
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field, AliasChoices, TypeAdapter
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime
 import uuid
 
 def generate_id(prefix: str) -> str:
     return f"{prefix}_{uuid.uuid4().hex[:8]}"
 
+# Supabase rows use snake_case (created_at) while the API uses camelCase (createdAt).
+# Accepting both lets us validate raw database rows directly, without rebuilding dicts first.
+def created_at_field():
+    return Field(validation_alias=AliasChoices("createdAt", "created_at"))
+
 # ********** Temporary Pydantic Models ********** Will make its own folder once backend skeleton done
 # 'class' is used since it acts a reusable blueprint for the shape of the data
 
@@ -14,17 +19,18 @@ class Message(BaseModel):
     id: str
     role: str # 'user' Or 'assistant'
     content: str
-    createdAt: datetime
+    createdAt: datetime = created_at_field()
 
 # Data shape of a singular chat session
 class Session(BaseModel):
     id: str
-    createdAt: datetime
+    createdAt: datetime = created_at_field()
     messages: List[Message] # A list of message objects
 
 # Data shape of the users text input
 class AnswerRequest(BaseModel):
     userAnswer: str
+    sources: Optional[List[str]] = None # Scope RAG retrieval to these ORX sources (e.g. ["ORX_RCL_2022"]); None = all
 
 # Data shape of the LLM's response
 class AnswerResponse(BaseModel):
@@ -34,6 +40,83 @@ class AnswerResponse(BaseModel):
 # Summary of all the sessions the user made
 class SessionSummary(BaseModel):
     id: str
-    createdAt: datetime
+    createdAt: datetime = created_at_field()
     # Add title later 
 
+# ********** Fast serialization adapters **********
+# Validate raw Supabase rows once and dump straight to JSON bytes (pydantic-core does both in Rust).
+# The output is byte-identical to what FastAPI produces through response_model.
+session_adapter = TypeAdapter(Session)
+session_summary_list_adapter = TypeAdapter(List[SessionSummary])
+
+def session_rows_to_json(session_row: Dict[str, Any], message_rows: List[Dict[str, Any]]) -> bytes:
+    session = session_adapter.validate_python({**session_row, "messages": message_rows})
+    return session_adapter.dump_json(session)
+
+def session_summary_rows_to_json(rows: List[Dict[str, Any]]) -> bytes:
+    return session_summary_list_adapter.dump_json(session_summary_list_adapter.validate_python(rows))
+
+
+# ********** Audit export records **********
+# One NDJSON line per record. A session line is followed by its messages, oldest first.
+class ExportedSession(BaseModel):
+    type: Literal["session"] = "session"
+    id: str
+    createdAt: datetime = created_at_field()
+
+class ExportedMessage(BaseModel):
+    type: Literal["message"] = "message"
+    sessionId: str = Field(validation_alias=AliasChoices("sessionId", "session_id"))
+    id: str
+    role: str
+    content: str
+    createdAt: datetime = created_at_field()
+
+# ********** Bulk session operations **********
+class BulkCreateRequest(BaseModel):
+    count: int = Field(ge=1, le=1000) # How many new sessions to create in one insert
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=10000)
+
+# Outcome for one session id, using the same status codes as the single-session routes (201 / 200 / 404 / 500)
+class BulkSessionResult(BaseModel):
+    id: str
+    status: int
+    detail: Optional[str] = None
+    createdAt: Optional[datetime] = None # Only set for created sessions
+
+class BulkSessionResponse(BaseModel):
+    results: List[BulkSessionResult]
+
+# ********** Batch grading **********
+# One line of the batch grading results file (also used as the resume checkpoint)
+class GradingResult(BaseModel):
+    sessionId: str
+    rubricVersion: str
+    libraryVersion: Optional[str] = None  # control library state the grade was made against (see batch_grading)
+    model: str
+    score: Optional[int] = None    # 1-5, None if the model reply couldn't be parsed
+    verdict: Optional[str] = None  # 'effective' | 'partially effective' | 'ineffective'
+    rationale: Optional[str] = None
+    error: Optional[str] = None
+    messageCount: int
+    gradedAt: datetime
+
+# ********** Ingestion jobs **********
+class IngestionJobRequest(BaseModel):
+    sources: Optional[List[str]] = None # Source names to ingest (e.g. ["ORX_RCL_2022"]); None = every Excel + PDF file
+
+# Data shape of a background ingestion job, with progress worked out from the last checkpoint
+class IngestionJob(BaseModel):
+    id: str
+    status: str # 'queued' | 'running' | 'interrupted' | 'completed' | 'failed'
+    sources: List[str]
+    checkpoint: Optional[Dict[str, Any]] = None # Last committed position: file, source, sheet/page, last chunk_index written
+    chunksDone: int
+    totalChunks: Optional[int] = None # Known once the job has planned its files
+    chunksPerSec: Optional[float] = None # Throughput of the current run
+    etaSeconds: Optional[float] = None
+    error: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
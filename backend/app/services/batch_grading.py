@@ -0,0 +1,386 @@
+# backend/app/services/batch_grading.py
+#
+# Re-grades stored interviews in bulk (e.g. after the control library or rubric changes).
+# Reads transcripts from chat_messages (or a session_export NDJSON file), retrieves ORX control library
+# context for each one, builds prompts with LLMConfig.build_prompt_contents, runs them with bounded
+# concurrency and appends one GradingResult per session to a JSONL file.
+# The results file doubles as the checkpoint: re-running skips sessions already graded under the same
+# rubric version, so an interrupted job just picks up where it stopped. The rubric version covers the
+# model, the instructions and the state of the control library, so re-ingesting the library (or
+# changing the rubric) makes the next run re-grade everything.
+#
+# The run is its own process with its own governor: it doesn't share a limiter with the API server.
+# Keep --concurrency low enough to leave Gemini quota for live interviews.
+#
+# CLI (run from backend/):
+#   python -m app.services.batch_grading -o grades.jsonl --concurrency 8
+#   python -m app.services.batch_grading -o grades.jsonl --force  # re-grade even if already graded
+#   python -m app.services.batch_grading -o grades.jsonl --fake   # no Gemini calls
+#   python -m app.services.batch_grading -o grades.jsonl --fake --transcripts export.ndjson.gz
+#       fully offline: transcripts from a session_export file, no Gemini or Supabase needed
+#
+# The Gemini client and the Supabase queries are only imported when they are actually used,
+# so --fake with --transcripts works without GEMINI_API_KEY or Supabase credentials.
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from itertools import groupby
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from google.genai import types
+
+from app.schema.schemas import GradingResult
+from app.services.llm_config import LLMConfig
+from app.services.upstream_governor import gemini_governor
+
+# --------- CONFIG ---------
+DEFAULT_CONCURRENCY = 4
+REPORT_EVERY = 25  # print throughput every N graded sessions
+
+CONTEXT_MATCHES = 8          # control library chunks added to each grading prompt
+CONTEXT_MIN_SIMILARITY = 0.35
+CONTEXT_QUERY_CHARS = 4000   # the retrieval query is the employee's answers, cut to this length
+
+GRADING_INSTRUCTIONS = (
+    "The conversation above is a completed control testing interview. "
+    "Grade how well the employee's answers show proper operational risk management practices. "
+    "Reply with ONLY a JSON object, no other text: "
+    '{"score": <integer 1-5>, "verdict": "effective" | "partially effective" | "ineffective", '
+    '"rationale": "<2-3 sentences>"}'
+)
+# ---------------------------
+
+def rubric_version(config: LLMConfig, library: str) -> str:
+    """
+    Short hash of everything that changes a grade. Bumps automatically when the rubric,
+    the model or the control library (see library_version) changes.
+    """
+    text = "\n".join([config.model, config.system_instructions(), GRADING_INSTRUCTIONS, library])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+def library_version() -> str:
+    """
+    Fingerprint of the ingested control library: the latest completed ingestion job, the highest
+    chunk_index and the chunk count. Any re-ingestion (job or standalone script) changes at least one.
+    """
+    from data.database import supabase  # needs Supabase credentials
+
+    jobs = (
+        supabase.table("ingestion_jobs")
+        .select("id, updated_at")
+        .eq("status", "completed")
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute()
+    ).data
+    chunks = supabase.table("chunks").select("chunk_index", count="exact").order("chunk_index", desc=True).limit(1).execute()
+
+    last_job = f"{jobs[0]['id']}@{jobs[0]['updated_at']}" if jobs else "no-jobs"
+    max_index = chunks.data[0]["chunk_index"] if chunks.data else -1
+    return f"{last_job}/max{max_index}/n{chunks.count}"
+
+# ********** Control library context **********
+
+def retrieve_context(messages: List[Dict[str, str]]) -> Optional[str]:
+    """ORX chunks relevant to the employee's answers, formatted like the live interview context."""
+    from app.services.rag_setup import format_context, retrieve_relevant_chunks  # Gemini + Supabase
+
+    answers = " ".join(m["content"] for m in messages if m["role"] == "user")[:CONTEXT_QUERY_CHARS]
+    if not answers.strip():
+        return None
+    matches = retrieve_relevant_chunks(
+        query=answers,
+        match_count=CONTEXT_MATCHES,
+        min_similarity=CONTEXT_MIN_SIMILARITY,
+    )
+    return format_context(matches)
+
+def fake_context(messages: List[Dict[str, str]]) -> Optional[str]:
+    """--fake stand-in for retrieve_context: a fixed passage, no embedding call or Supabase query."""
+    return "[Source: FAKE_ORX_LIBRARY]\nKey controls are tested at least annually by the second line of defence."
+
+# ********** Transcripts **********
+
+def iter_transcripts(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[Tuple[str, List[Dict[str, str]]]]:
+    """Yield (session_id, [{"role", "content"}, ...]) for every session that has messages, oldest message first."""
+    from app.services.session_export import iter_session_pages, iter_message_rows  # needs Supabase credentials
+
+    for sessions in iter_session_pages(start, end):
+        rows = iter_message_rows([s["id"] for s in sessions])
+        for session_id, messages in groupby(rows, key=lambda m: m["session_id"]):
+            yield session_id, [{"role": m["role"], "content": m["content"]} for m in messages]
+
+def iter_transcripts_from_file(
+    path: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[Tuple[str, List[Dict[str, str]]]]:
+    """
+    Same as iter_transcripts, but reads a session_export NDJSON file (.gz is decompressed).
+    Each session line is followed by its own messages, so only one transcript is held at a time.
+    """
+    def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+        # Naive bounds mean UTC, same as when they are sent to Supabase
+        return value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+
+    start, end = as_utc(start), as_utc(end)
+    opener = gzip.open if path.endswith(".gz") else open
+    session_id, messages, in_range = None, [], False
+
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+
+            if row["type"] == "session":
+                if session_id is not None and in_range and messages:
+                    yield session_id, messages
+                created = as_utc(datetime.fromisoformat(row["createdAt"]))
+                session_id, messages = row["id"], []
+                in_range = (start is None or created >= start) and (end is None or created < end)
+            elif row["sessionId"] != session_id:
+                raise ValueError(f"{path}: message {row['id']} is not under its session line ({row['sessionId']})")
+            else:
+                messages.append({"role": row["role"], "content": row["content"]})
+
+    if session_id is not None and in_range and messages:
+        yield session_id, messages
+
+# ********** Checkpoint **********
+
+def load_graded_session_ids(path: str, version: str) -> Set[str]:
+    """Sessions already in the results file for this rubric version (errors are retried)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # half-written last line from a crash
+            if row.get("rubricVersion") == version and not row.get("error"):
+                done.add(row["sessionId"])
+    return done
+
+# ********** Grading **********
+
+def parse_grade(text: str) -> Dict[str, Any]:
+    """Pull the JSON object out of the model reply (tolerates ```json fences and surrounding text)."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("no JSON object in model reply")
+    data = json.loads(text[start:end + 1])
+    return {
+        "score": int(data["score"]),
+        "verdict": str(data.get("verdict", "")) or None,
+        "rationale": str(data.get("rationale", "")) or None,
+    }
+
+def grade_transcript(
+    llm_client: Any,
+    config: LLMConfig,
+    version: str,
+    session_id: str,
+    messages: List[Dict[str, str]],
+    retrieve: Callable[[List[Dict[str, str]]], Optional[str]] = retrieve_context,
+    library: Optional[str] = None,
+) -> GradingResult:
+    result = {
+        "sessionId": session_id,
+        "rubricVersion": version,
+        "libraryVersion": library,
+        "model": config.model,
+        "messageCount": len(messages),
+    }
+
+    try:
+        contents = LLMConfig.build_prompt_contents(
+            config,
+            user_input=GRADING_INSTRUCTIONS,
+            context_text=retrieve(messages),
+            past_messages=messages,
+        )
+        # Governs this process's calls only: the API server has its own limiter (see the header)
+        response = gemini_governor.call(
+            config.model,
+            lambda remaining: llm_client.models.generate_content(
+                model=config.model,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+                ),
+            ),
+        )
+        result.update(parse_grade(response.text or ""))
+    except Exception as e:
+        # Keep going: the failed session is written with its error and retried on the next run
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    return GradingResult(**result, gradedAt=datetime.now(timezone.utc))
+
+class FakeGeminiClient:
+    """
+    Stand-in for genai.Client in --fake mode: same models.generate_content() shape,
+    returns a deterministic grade per transcript after a small simulated delay.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.models = self
+
+    def generate_content(self, model: str, contents: List[Dict[str, Any]], config: Any = None):
+        transcript = "".join(part["text"] for c in contents for part in c["parts"])
+        seed = int(hashlib.sha256(transcript.encode("utf-8")).hexdigest(), 16)
+        time.sleep(self.latency * (0.5 + random.random()))
+
+        score = seed % 5 + 1
+        verdict = "effective" if score >= 4 else "partially effective" if score == 3 else "ineffective"
+        text = json.dumps({"score": score, "verdict": verdict, "rationale": f"Fake grade from {model}."})
+        return SimpleNamespace(text=text)
+
+# ********** Runner **********
+
+def run_batch(
+    output_path: str,
+    llm_client: Any,
+    config: Optional[LLMConfig] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    transcripts_path: Optional[str] = None,
+    retrieve: Callable[[List[Dict[str, str]]], Optional[str]] = retrieve_context,
+    library: Optional[str] = None,
+    version: Optional[str] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Grade every stored transcript not yet graded under the current rubric version.
+    Transcripts come from Supabase, or from a session_export file when transcripts_path is given.
+    library: control library fingerprint (default: library_version()); version overrides the computed
+    rubric version; force re-grades sessions even if the results file already has them.
+    At most `concurrency` model calls run at once, and at most 2x that many transcripts are held in memory.
+    Returns a summary dict (graded, failed, skipped, elapsed seconds, sessions/sec).
+    """
+    config = config or LLMConfig()
+    library = library if library is not None else library_version()
+    version = version or rubric_version(config, library)
+    already_done = set() if force else load_graded_session_ids(output_path, version)
+    print(f"Rubric version {version} (library {library}): {len(already_done)} sessions already graded, skipping them.")
+
+    stats = {"graded": 0, "failed": 0, "skipped": 0}
+    write_lock = threading.Lock()
+    t0 = time.perf_counter()
+
+    def record(result: GradingResult, out):
+        with write_lock:
+            # One line per result, flushed right away so a crash loses at most the in-flight sessions
+            out.write(result.model_dump_json() + "\n")
+            out.flush()
+            stats["failed" if result.error else "graded"] += 1
+
+            finished = stats["graded"] + stats["failed"]
+            if finished % REPORT_EVERY == 0:
+                elapsed = time.perf_counter() - t0
+                print(f"  {finished} graded ({stats['failed']} failed) - {finished / elapsed:.2f} sessions/sec")
+
+    submitted = 0
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = set()
+
+        transcripts = (
+            iter_transcripts_from_file(transcripts_path, start, end)
+            if transcripts_path
+            else iter_transcripts(start, end)
+        )
+        for session_id, messages in transcripts:
+            if session_id in already_done:
+                stats["skipped"] += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+
+            # Bounded queue: wait for a slot instead of reading every transcript up front
+            if len(in_flight) >= concurrency * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future.result(), out)
+
+            in_flight.add(
+                pool.submit(grade_transcript, llm_client, config, version, session_id, messages, retrieve, library)
+            )
+            submitted += 1
+
+        for future in wait(in_flight).done:
+            record(future.result(), out)
+
+    elapsed = time.perf_counter() - t0
+    finished = stats["graded"] + stats["failed"]
+    summary = {
+        **stats,
+        "rubric_version": version,
+        "elapsed_sec": round(elapsed, 2),
+        "sessions_per_sec": round(finished / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    print(
+        f"\nAll done. Graded {stats['graded']}, failed {stats['failed']}, skipped {stats['skipped']} "
+        f"in {summary['elapsed_sec']}s ({summary['sessions_per_sec']} sessions/sec)."
+    )
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-grade stored interview transcripts in bulk.")
+    parser.add_argument("-o", "--output", required=True, help="results JSONL file (also the resume checkpoint)")
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="max model calls in flight; this process doesn't share the API server's limiter, so keep it low enough to leave quota for live interviews",
+    )
+    parser.add_argument("--start", type=datetime.fromisoformat, help="only sessions created at or after this time (ISO 8601)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="only sessions created before this time (ISO 8601)")
+    parser.add_argument("--limit", type=int, help="grade at most this many sessions in this run")
+    parser.add_argument("--fake", action="store_true", help="use a fake model instead of calling Gemini")
+    parser.add_argument("--transcripts", help="read transcripts from a session_export NDJSON file (.gz ok) instead of Supabase")
+    parser.add_argument("--force", action="store_true", help="re-grade sessions already in the results file for this version")
+    parser.add_argument("--rubric-version", help="use this version label instead of the computed one")
+    parser.add_argument("--library-version", help="control library fingerprint to use instead of reading it from Supabase")
+    args = parser.parse_args()
+
+    if args.fake:
+        llm_client, retrieve = FakeGeminiClient(), fake_context
+        library = args.library_version or "fake"
+    else:
+        from app.services.llm_service import client as llm_client  # creates the Gemini client, needs GEMINI_API_KEY
+        retrieve = retrieve_context
+        library = args.library_version or library_version()
+
+    run_batch(
+        output_path=args.output,
+        llm_client=llm_client,
+        concurrency=args.concurrency,
+        start=args.start,
+        end=args.end,
+        limit=args.limit,
+        transcripts_path=args.transcripts,
+        retrieve=retrieve,
+        library=library,
+        version=args.rubric_version,
+        force=args.force,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# backend/app/services/chunking.py
+#
+# One chunker for everything we embed (replaces the two character-window splitters).
+# - packs whole sentences into chunks up to a token budget, so chunks end on a sentence boundary
+# - overlap is a token budget filled with whole trailing sentences first, instead of a fixed 200 characters
+# - short page tails are carried over into the next page instead of becoming tiny chunks of their own
+# - header/footer lines repeated across most pages of a PDF are dropped before chunking
+#
+# Tokens are estimated from characters (~4 per token for English), which is close enough for budgeting
+# and avoids a tokenizer call per sentence.
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# --------- CONFIG ---------
+MAX_TOKENS = 300      # ~1200 characters, same size as the old PDF chunks
+MIN_TOKENS = 80       # a page tail smaller than this is merged into the next page's first chunk
+OVERLAP_TOKENS = 60   # ~240 characters of the previous chunk carried over: trailing sentences, topped up with words
+CHARS_PER_TOKEN = 4
+
+HEADER_FOOTER_LINES = 3     # how many lines at the top/bottom of each page can be a header/footer
+HEADER_FOOTER_SHARE = 0.5   # ... and they must repeat on at least this share of pages
+# ---------------------------
+
+SENTENCE_END = re.compile(r"(?<=[.!?:;])\s+(?=[A-Z0-9\"'“‘(•\-–])")
+ENUMERATOR = re.compile(r"^\d+\.$")  # "5." from a numbered list: belongs to the sentence after it
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def clean_text(text: str) -> str:
+    """Basic cleanup: collapse whitespace and strip."""
+    if not text:
+        return ""
+    return " ".join(text.split())
+
+def split_sentences(text: str, max_tokens: int = MAX_TOKENS) -> List[str]:
+    """Split cleaned text into sentences; anything longer than the budget is cut at word boundaries."""
+    sentences = []
+    pieces = SENTENCE_END.split(clean_text(text))
+    for i, sentence in enumerate(pieces):
+        if ENUMERATOR.match(sentence) and i + 1 < len(pieces):
+            pieces[i + 1] = f"{sentence} {pieces[i + 1]}"
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            if sentence:
+                sentences.append(sentence)
+            continue
+
+        # Long run-on "sentence" (tables, bullet lists without punctuation): fall back to words
+        piece: List[str] = []
+        for word in sentence.split(" "):
+            if piece and estimate_tokens(" ".join(piece + [word])) > max_tokens:
+                sentences.append(" ".join(piece))
+                piece = []
+            piece.append(word)
+        if piece:
+            sentences.append(" ".join(piece))
+    return sentences
+
+# ********** Headers / footers **********
+
+def _line_key(line: str) -> str:
+    # "Page 3 of 16" and "Page 4 of 16" should count as the same line
+    return re.sub(r"\d+", "#", clean_text(line)).lower()
+
+def strip_repeated_lines(pages: List[str]) -> List[str]:
+    """
+    Drop lines that sit in the top/bottom few lines of most pages (running headers, footers, page numbers).
+    Also drops a page number glued to the start of the first line ("3Introduction" on page 3), but only
+    when most pages start that way, so text like "1st line of defence" on page 1 is left alone.
+    """
+    page_lines = [[line for line in page.splitlines() if line.strip()] for page in pages]
+
+    def glued_label(page_num: int, line: str) -> bool:
+        page_label = str(page_num + 1)
+        return line.startswith(page_label) and line[len(page_label):len(page_label) + 1].isalpha()
+
+    counts: Counter = Counter()
+    for lines in page_lines:
+        edges = lines[:HEADER_FOOTER_LINES] + lines[-HEADER_FOOTER_LINES:]
+        counts.update({_line_key(line) for line in edges})
+
+    min_pages = max(3, math.ceil(len(pages) * HEADER_FOOTER_SHARE))
+    repeated = {key for key, n in counts.items() if n >= min_pages}  # includes "#": bare page numbers
+
+    cleaned = []
+    for page_num, lines in enumerate(page_lines):
+        last = len(lines) - 1
+        kept = [
+            line for i, line in enumerate(lines)
+            if not ((i < HEADER_FOOTER_LINES or i > last - HEADER_FOOTER_LINES) and _line_key(line) in repeated)
+        ]
+        cleaned.append(kept)
+
+    # Glued page labels only count once they repeat like any other header
+    glued = sum(1 for page_num, kept in enumerate(cleaned) if kept and glued_label(page_num, kept[0]))
+    if glued >= min_pages:
+        for page_num, kept in enumerate(cleaned):
+            if kept and glued_label(page_num, kept[0]):
+                kept[0] = kept[0][len(str(page_num + 1)):]
+
+    return ["\n".join(kept) for kept in cleaned]
+
+# ********** Packing **********
+
+def _pack(
+    sentences: Iterable[Tuple[int, str]],
+    max_tokens: int,
+    min_tokens: int,
+    overlap_tokens: int,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Greedily pack (page, sentence) pairs into chunks.
+    A page change closes the current chunk only if it already has min_tokens; otherwise the
+    short tail rides along into the next page.
+    """
+    buffer: List[str] = []
+    tokens = 0
+    first_page = last_page = None
+    fresh = False  # buffer holds something besides the carried-over overlap sentences
+
+    def flush():
+        return {"text": " ".join(buffer), "page": first_page, "page_end": last_page}
+
+    for page, sentence in sentences:
+        size = estimate_tokens(sentence) + 1
+
+        page_break = last_page is not None and page != last_page and tokens >= min_tokens
+        if fresh and (tokens + size > max_tokens or page_break):
+            yield flush()
+
+            # Carry trailing sentences up to the overlap budget if we stay on the same page, topping the budget
+            # up with the last words of the sentence before them, so that any span of up to overlap_tokens
+            # across the boundary lands whole in one chunk (the old 200-character overlap guaranteed the same)
+            tail: List[str] = []
+            tail_tokens = 0
+            budget = min(overlap_tokens, max_tokens - size)
+            if not page_break:
+                for prev in reversed(buffer):
+                    prev_size = estimate_tokens(prev) + 1
+                    if tail_tokens + prev_size <= budget:
+                        tail.insert(0, prev)
+                        tail_tokens += prev_size
+                        continue
+
+                    words: List[str] = []
+                    for word in reversed(prev.split(" ")):
+                        word_size = estimate_tokens(word) + 1
+                        if tail_tokens + word_size > budget:
+                            break
+                        words.insert(0, word)
+                        tail_tokens += word_size
+                    if words:
+                        tail.insert(0, " ".join(words))
+                    break
+            buffer, tokens = tail, tail_tokens
+            first_page = last_page if tail else None
+            fresh = False
+
+        if first_page is None:
+            first_page = page
+        buffer.append(sentence)
+        tokens += size
+        last_page = page
+        fresh = True
+
+    if fresh:
+        yield flush()
+
+def chunk_pages(
+    pages: List[str],
+    max_tokens: int = MAX_TOKENS,
+    min_tokens: int = MIN_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
+    strip_headers: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk a document given as a list of raw page texts (0-based page numbers).
+    Yields {"text", "page", "page_end"}; page_end differs from page when a short tail was merged across pages.
+    """
+    if strip_headers:
+        pages = strip_repeated_lines(pages)
+
+    # Long sentences are cut short enough that the overlap still fits in front of them
+    sentences = (
+        (page_num, sentence)
+        for page_num, page in enumerate(pages)
+        for sentence in split_sentences(page, max(max_tokens - overlap_tokens, 1))
+    )
+    yield from _pack(sentences, max_tokens, min_tokens, overlap_tokens)
+
+def chunk_text(
+    text: str,
+    max_tokens: int = MAX_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
+) -> List[str]:
+    """Chunk a single piece of text (no pages, no header stripping)."""
+    return [c["text"] for c in chunk_pages([text], max_tokens, 0, overlap_tokens, strip_headers=False)]
@@ -1,10 +1,15 @@
 # backend/rag/ingest_excels.py
+# Run from backend/:  python -m app.services.excel_ingestion
 
 import os
+from typing import Any, Dict, Iterator, Tuple
+
 import pandas as pd
 from supabase import create_client
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
+from app.services.upstream_governor import gemini_governor
 load_dotenv()
 
 # --------- CONFIG ---------
@@ -29,10 +34,16 @@ supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 gemini = genai.Client(api_key=GEMINI_API_KEY)
 
 def get_embedding(text: str):
-    """Call Gemini embedding API and return a list[float]."""
-    res = gemini.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=text,
+    """Call Gemini embedding API (through the shared governor) and return a list[float]."""
+    res = gemini_governor.call(
+        EMBEDDING_MODEL,
+        lambda remaining: gemini.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=text,
+            config=types.EmbedContentConfig(
+                http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+            ),
+        ),
     )
     return res.embeddings[0].values
 
@@ -49,19 +60,15 @@ def row_to_text(row: pd.Series) -> str:
         parts.append(f"{col}: {val}")
     return " | ".join(parts)
 
-def ingest_excel(path: str, source_name: str, start_index: int = 0) -> int:
+def iter_excel_chunks(path: str, source_name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
     """
-    Ingest a single Excel file into the `chunks` table.
-    Returns the next chunk_index to use (so indexes can continue across files).
+    Yield (text, metadata) for every non-empty row of every sheet, in a fixed order.
+    Shared by ingest_excel and the background ingestion jobs (which rely on the order to resume).
     """
-    print(f"\n=== Ingesting {path} as source '{source_name}' ===")
-
     # Read all sheets
     xls = pd.ExcelFile(path)
-    chunk_index = start_index
 
     for sheet_name in xls.sheet_names:
-        print(f"  Sheet: {sheet_name}")
         df = pd.read_excel(xls, sheet_name=sheet_name)
 
         for row_idx, row in df.iterrows():
@@ -69,21 +76,38 @@ def ingest_excel(path: str, source_name: str, start_index: int = 0) -> int:
             if not text.strip():
                 continue
 
-            emb = get_embedding(text)
-
-            # Insert into chunks table
-            supabase.table("chunks").insert({
-                "chunk_index": int(chunk_index),
-                "content": text,
-                "metadata": {
-                    "source": source_name,
-                    "sheet": sheet_name,
-                    "row": int(row_idx),
-                },
-                "embedding": emb,
-            }).execute()
-
-            chunk_index += 1
+            yield text, {
+                "source": source_name,
+                "sheet": sheet_name,
+                "row": int(row_idx),
+            }
+
+def ingest_excel(path: str, source_name: str, start_index: int = 0) -> int:
+    """
+    Ingest a single Excel file into the `chunks` table.
+    Returns the next chunk_index to use (so indexes can continue across files).
+    """
+    print(f"\n=== Ingesting {path} as source '{source_name}' ===")
+
+    chunk_index = start_index
+    current_sheet = None
+
+    for text, metadata in iter_excel_chunks(path, source_name):
+        if metadata["sheet"] != current_sheet:
+            current_sheet = metadata["sheet"]
+            print(f"  Sheet: {current_sheet}")
+
+        emb = get_embedding(text)
+
+        # Insert into chunks table
+        supabase.table("chunks").insert({
+            "chunk_index": int(chunk_index),
+            "content": text,
+            "metadata": metadata,
+            "embedding": emb,
+        }).execute()
+
+        chunk_index += 1
 
     print(f"Finished {path}. Total chunks so far: {chunk_index - start_index}")
     return chunk_index
@@ -0,0 +1,306 @@
+# backend/app/services/ingestion_jobs.py
+#
+# Runs Excel/PDF ingestion in the background inside the backend, instead of as one-off scripts.
+# - one worker thread, so request-serving workers never do ingestion work
+# - chunks are embedded and inserted in batches; after every batch the job row in `ingestion_jobs`
+#   gets a checkpoint (file, sheet/page, units done in that file, last chunk_index written)
+# - a restarted backend picks unfinished jobs back up and resumes from the checkpoint
+# - chunks carry metadata.job_id, so anything inserted after the last checkpoint (batch landed,
+#   checkpoint didn't) is deleted before resuming, and nothing is ingested twice
+# - every batch reserves its chunk_index range in the database first, so jobs running in
+#   different backend processes never write the same index
+#
+# Table definition: data/sql/ingestion_jobs.sql
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.schema.schemas import IngestionJob, generate_id
+from app.services.excel_ingestion import EXCEL_FILES, iter_excel_chunks
+from app.services.pdf_ingestion import PDF_FILES, iter_pdf_chunks
+from app.services.rag_setup import get_embedding
+from data.database import supabase
+
+# --------- CONFIG ---------
+BATCH_SIZE = 20               # chunks embedded + inserted per checkpoint
+EMBED_CONCURRENCY = 4         # embedding calls in flight per batch (the governor still has the final say)
+STALE_AFTER = timedelta(minutes=5)  # a 'running' job with no checkpoint for this long is assumed dead
+RESCAN_EVERY_SEC = 60         # how often the worker looks for jobs left behind by a crashed process
+# ---------------------------
+
+# Every file the backend can ingest: source name -> (path relative to backend/, kind)
+SOURCE_FILES: Dict[str, Tuple[str, str]] = {
+    **{source: (path, "excel") for path, source in EXCEL_FILES},
+    **{source: (path, "pdf") for path, source in PDF_FILES},
+}
+
+class _Stopped(Exception):
+    """Raised inside a run when the backend is shutting down."""
+
+def iter_source_chunks(source: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    path, kind = SOURCE_FILES[source]
+    if kind == "excel":
+        return iter_excel_chunks(path, source)
+    return iter_pdf_chunks(path, source)
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def reserve_chunk_indexes(n: int) -> int:
+    """Reserve n consecutive chunk_index values for one batch, returns the first one."""
+    result = supabase.rpc("reserve_chunk_indexes", {"n": n}).execute()
+    return int(result.data)
+
+def job_from_row(row: Dict[str, Any]) -> IngestionJob:
+    """Turn an ingestion_jobs row into the API shape, working out throughput and ETA for running jobs."""
+    chunks_per_sec = eta = None
+
+    if row["status"] == "running" and row.get("run_started_at"):
+        elapsed = (datetime.fromisoformat(row["updated_at"]) - datetime.fromisoformat(row["run_started_at"])).total_seconds()
+        done_this_run = row["chunks_done"] - row["run_start_chunks"]
+        if elapsed > 0 and done_this_run > 0:
+            chunks_per_sec = round(done_this_run / elapsed, 2)
+            if row.get("total_chunks") is not None:
+                eta = round(max(row["total_chunks"] - row["chunks_done"], 0) / chunks_per_sec, 1)
+
+    return IngestionJob(
+        id=row["id"],
+        status=row["status"],
+        sources=row["sources"],
+        checkpoint=row.get("checkpoint"),
+        chunksDone=row["chunks_done"],
+        totalChunks=row.get("total_chunks"),
+        chunksPerSec=chunks_per_sec,
+        etaSeconds=eta,
+        error=row.get("error"),
+        createdAt=row["created_at"],
+        updatedAt=row["updated_at"],
+    )
+
+class IngestionJobRunner:
+    def __init__(self):
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued: set = set()
+        self._queued_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_scan = 0.0
+
+    # ********** Lifecycle (called from the FastAPI lifespan) **********
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._work, name="ingestion-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Finish the batch in progress, mark the job interrupted so the next start resumes it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ********** API **********
+
+    def submit(self, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+        sources = sources or list(SOURCE_FILES)
+        unknown = [s for s in sources if s not in SOURCE_FILES]
+        if unknown:
+            raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+
+        result = (
+            supabase
+            .table("ingestion_jobs")
+            .insert({"id": generate_id("job"), "status": "queued", "sources": sources})
+            .execute()
+        )
+        row = result.data[0]
+        self._enqueue(row["id"])
+        return row
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Re-queue a failed job; it continues from its last checkpoint."""
+        result = (
+            supabase
+            .table("ingestion_jobs")
+            .update({"status": "interrupted", "updated_at": utc_now().isoformat()})
+            .eq("id", job_id)
+            .eq("status", "failed")
+            .execute()
+        )
+        if not result.data:
+            return None
+        self._enqueue(job_id)
+        return result.data[0]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        result = supabase.table("ingestion_jobs").select("*").eq("id", job_id).execute()
+        return result.data[0] if result.data else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        result = supabase.table("ingestion_jobs").select("*").order("created_at", desc=True).execute()
+        return result.data or []
+
+    # ********** Worker **********
+
+    def _enqueue(self, job_id: str) -> None:
+        with self._queued_lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+        self._queue.put(job_id)
+
+    def _scan_for_resumable(self) -> None:
+        """Queue jobs that are waiting, were interrupted, or belong to a process that died mid-run."""
+        self._last_scan = time.monotonic()
+        try:
+            result = (
+                supabase
+                .table("ingestion_jobs")
+                .select("id")
+                .in_("status", ["queued", "interrupted", "running"])
+                .order("created_at")
+                .execute()
+            )
+        except Exception as e:
+            print(f"Ingestion jobs: could not scan for unfinished jobs: {e}")
+            return
+        for row in result.data or []:
+            self._enqueue(row["id"])  # _claim decides whether a 'running' one is really abandoned
+
+    def _work(self) -> None:
+        self._scan_for_resumable()
+        while not self._stop.is_set():
+            if time.monotonic() - self._last_scan > RESCAN_EVERY_SEC:
+                self._scan_for_resumable()
+            try:
+                job_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            with self._queued_lock:
+                self._queued.discard(job_id)
+            try:
+                self._run(job_id)
+            except _Stopped:
+                self._mark(job_id, {"status": "interrupted"})
+            except Exception as e:
+                print(f"Ingestion job {job_id} failed: {e}")
+                self._mark(job_id, {"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    def _mark(self, job_id: str, fields: Dict[str, Any]) -> None:
+        # Final status write; if even this fails the job looks 'running' and is picked up again once stale
+        try:
+            self._update(job_id, fields)
+        except Exception as e:
+            print(f"Ingestion job {job_id}: could not record status {fields.get('status')}: {e}")
+
+    def _update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        supabase.table("ingestion_jobs").update({**fields, "updated_at": utc_now().isoformat()}).eq("id", job_id).execute()
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically mark the job as ours. Only succeeds for queued / interrupted jobs, or 'running'
+        ones whose last checkpoint is older than STALE_AFTER, so two workers never run the same job.
+        """
+        now = utc_now()
+        stale = (now - STALE_AFTER).strftime("%Y-%m-%dT%H:%M:%SZ")
+        result = (
+            supabase
+            .table("ingestion_jobs")
+            .update({"status": "running", "run_started_at": now.isoformat(), "updated_at": now.isoformat(), "error": None})
+            .eq("id", job_id)
+            .or_(f'status.in.(queued,interrupted),and(status.eq.running,updated_at.lt."{stale}")')
+            .execute()
+        )
+        if not result.data:
+            return None
+
+        row = result.data[0]
+        self._update(job_id, {"run_start_chunks": row["chunks_done"]})
+        return row
+
+    def _run(self, job_id: str) -> None:
+        job = self._claim(job_id)
+        if job is None:
+            return  # finished, or another worker has it
+
+        checkpoint = job.get("checkpoint") or {}
+        chunks_done = job["chunks_done"]
+
+        if job.get("total_chunks") is None:
+            # Chunking without embedding is cheap, so count up front for the ETA
+            total = sum(sum(1 for _ in iter_source_chunks(source)) for source in job["sources"])
+            self._update(job_id, {"total_chunks": total})
+
+        # Drop chunks from a batch that was inserted after the last checkpoint was written.
+        # Reserved ranges only ever grow, so those are exactly the job's chunks past last_chunk_index;
+        # with no checkpoint yet, every chunk carrying this job_id is one of them.
+        last_index = checkpoint.get("last_chunk_index")
+        orphans = supabase.table("chunks").delete().eq("metadata->>job_id", job_id)
+        if last_index is not None:
+            orphans = orphans.gt("chunk_index", last_index)
+        orphans.execute()
+
+        sources_done = list(checkpoint.get("sources_done", []))
+        print(f"Ingestion job {job_id}: resuming after chunk_index {last_index}, {chunks_done} chunks already done")
+
+        with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+            for source in job["sources"]:
+                if source in sources_done:
+                    continue
+
+                path, _ = SOURCE_FILES[source]
+                units_done = checkpoint.get("units_done", 0) if checkpoint.get("source") == source else 0
+                chunks = islice(iter_source_chunks(source), units_done, None)
+
+                while True:
+                    batch = list(islice(chunks, BATCH_SIZE))
+                    if not batch:
+                        break
+
+                    embeddings = list(pool.map(get_embedding, [text for text, _ in batch]))
+                    next_index = reserve_chunk_indexes(len(batch))
+                    supabase.table("chunks").insert([
+                        {
+                            "chunk_index": next_index + i,
+                            "content": text,
+                            "metadata": {**metadata, "job_id": job_id},
+                            "embedding": embedding,
+                        }
+                        for i, ((text, metadata), embedding) in enumerate(zip(batch, embeddings))
+                    ]).execute()
+
+                    last_index = next_index + len(batch) - 1
+                    units_done += len(batch)
+                    chunks_done += len(batch)
+                    last = batch[-1][1]
+                    checkpoint = {
+                        "source": source,
+                        "file": path,
+                        "units_done": units_done,
+                        "sheet": last.get("sheet"),
+                        "page": last.get("page"),
+                        "last_chunk_index": last_index,
+                        "sources_done": sources_done,
+                    }
+                    self._update(job_id, {"checkpoint": checkpoint, "chunks_done": chunks_done})
+
+                    if self._stop.is_set():
+                        raise _Stopped()
+
+                sources_done.append(source)
+                checkpoint = {"last_chunk_index": last_index, "sources_done": sources_done}
+                self._update(job_id, {"checkpoint": checkpoint})
+
+        self._update(job_id, {"status": "completed"})
+        print(f"Ingestion job {job_id}: completed, {chunks_done} chunks")
+
+# Shared runner, started and stopped by the app lifespan in app/main.py
+ingestion_runner = IngestionJobRunner()
@@ -0,0 +1,105 @@
+# backend/app/services/llm_config.py
+#
+# Interviewer settings and prompt building (LLMConfig), kept apart from llm_service so they can be
+# imported without creating the Gemini / Supabase clients (batch_grading --fake runs without either).
+# llm_service re-exports LLMConfig, so `from app.services.llm_service import LLMConfig` keeps working.
+
+from typing import List, Dict, Any, Optional
+
+class LLMConfig:
+    # Constructor function
+    def __init__(
+        self,
+        model: str = "gemini-2.5-flash-lite",
+        max_words: int = 250,
+        allow_images: bool = False,
+    # Add more parameters here as needed to make the bot more interview like
+    ):
+        self.model = model
+        self.max_words = max_words
+        self.allow_images = allow_images
+        self._system_message = None # (settings, message) memo, see system_message()
+
+    # System instructions (rules the llm is to adhere to) --> This is where we can make the llm more interview like
+    def system_instructions(self) -> str:
+        parts = [
+            "You are a real interviewer, interviewing employees of a financial institution.",
+            "Your job as an interviewer is to determine if the user is following proper operational risk management practices while in the workplace.",
+            "You are to ask the user questions and evaluate their answers. ",
+            #"You are a helpful assistant that can answer questions about the ORX Reference Control Library.",
+            "Always answer in plain text.",
+            f"Keep responses under {self.max_words} words unless absolutely necessary.",
+        ]
+        
+        if not self.allow_images:
+            parts.append("Do NOT create or describe images, diagrams, or markdown tables.")
+        
+        return " ".join(parts)
+
+    # The system message is identical on every turn, so build it once per distinct set of settings
+    # (it's rebuilt if model / max_words / allow_images are changed on this config)
+    def system_message(self) -> Dict[str, Any]:
+        settings = (self.model, self.max_words, self.allow_images)
+        if self._system_message is None or self._system_message[0] != settings:
+            message = {
+                "role": "user",
+                "parts": [{"text": f"System instructions: {self.system_instructions()}"}],
+            }
+            self._system_message = (settings, message)
+        return self._system_message[1]
+
+    # Build the LLM prompt (system instructions + context (not for POC but quickly added) + new user input)
+    @staticmethod
+    def build_prompt_contents(
+        config: "LLMConfig",
+        user_input: str,
+        context_text: Optional[str] = None,
+        past_messages: Optional[List[Dict[str, str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        # Order matters for prefix caching: system instructions + past messages never change between turns,
+        # so they go first; retrieved context changes every turn, so it goes right before the new input.
+        # The first 1 + len(past_messages) entries are the stable prefix (see PromptCache).
+        contents: List[Dict[str, Any]] = []
+
+        # System message (Gemini doesn't have a strict 'system' role,
+        # so we inject it as an initial "user" message with instructions).
+        contents.append(config.system_message())
+
+        # Past conversation messages (map 'assistant' -> 'model' for Gemini)
+        if past_messages:
+            for msg in past_messages:
+                role = "user" if msg["role"] == "user" else "model"
+                contents.append(
+                    {
+                        "role": role,
+                        "parts": [{"text": msg["content"]}],
+                    }
+                )
+
+        # Optional retrieved context from the vector database
+        if context_text:
+            contents.append(
+                {
+                    "role": "user",
+                    "parts": [
+                        {
+                            "text": (
+                                "Here is background context from internal ORX documents. "
+                                "Use it to answer the user's question. "
+                                "If it seems irrelevant, ignore it.\n\n"
+                                f"{context_text}"
+                            )
+                        }
+                    ],
+                }
+            )
+
+        # Current user input
+        contents.append(
+            {
+                "role": "user",
+                "parts": [{"text": user_input}],
+            }
+        )
+
+        return contents
@@ -1,15 +1,25 @@
 from google import genai
+from google.genai import types
 from fastapi import APIRouter
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 import os
-from .rag_setup import retrieve_relevant_chunks
+import time
+from .llm_config import LLMConfig
+from .rag_setup import format_context, retrieve_relevant_chunks
+from .upstream_governor import gemini_governor, status_code
+from .prompt_cache import PromptCache
 load_dotenv()
 
 router = APIRouter()
 
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
+# --------- CONFIG ---------
+TURN_DEADLINE_SECONDS = 60.0      # one interview turn (query embedding + reply) must finish within this
+RETRIEVAL_DEADLINE_SECONDS = 10.0 # most of the turn budget the query embedding may use, the reply gets the rest
+# ---------------------------
+
 #Here are all the components/functions i want to make for my llm_service
 
 # 1. set up LLM parameters (only respond in text, dont make pictures, 250 word limit, things like that)
@@ -17,96 +27,6 @@ client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 # 3. build the LLM prompt. incorporate values from functions (1) and (2), as well as give user input
 # 4. generate content (setting the data to chat and getting hte response, then returning the response)
 
-class LLMConfig:
-    # Constructor function
-    def __init__(
-        self,
-        model: str = "gemini-2.5-flash-lite",
-        max_words: int = 250,
-        allow_images: bool = False,
-    # Add more parameters here as needed to make the bot more interview like
-    ):
-        self.model = model
-        self.max_words = max_words
-        self.allow_images = allow_images
-
-    # System instructions (rules the llm is to adhere to) --> This is where we can make the llm more interview like
-    def system_instructions(self) -> str:
-        parts = [
-            "You are a real interviewer, interviewing employees of a financial institution.",
-            "Your job as an interviewer is to determine if the user is following proper operational risk management practices while in the workplace.",
-            "You are to ask the user questions and evaluate their answers. ",
-            #"You are a helpful assistant that can answer questions about the ORX Reference Control Library.",
-            "Always answer in plain text.",
-            "Do NOT create or describe images, diagrams, or markdown tables.",
-            f"Keep responses under {self.max_words} words unless absolutely necessary.",
-        ]
-        
-        if not self.allow_images:
-            parts.append("Do NOT create or describe images, diagrams, or markdown tables.")
-        
-        return " ".join(parts)
-
-    # Build the LLM prompt (system instructions + context (not for POC but quickly added) + new user input)
-    @staticmethod
-    def build_prompt_contents(
-        config: "LLMConfig",
-        user_input: str,
-        context_text: Optional[str] = None,
-        past_messages: Optional[List[Dict[str, str]]] = None,
-    ) -> List[Dict[str, Any]]:
-        contents: List[Dict[str, Any]] = []
-
-        # System message (Gemini doesn't have a strict 'system' role,
-        # so we inject it as an initial "user" message with instructions).
-        contents.append(
-            {
-                "role": "user",
-                "parts": [
-                    {"text": f"System instructions: {config.system_instructions()}"}
-                ],
-            }
-        )
-
-        # Optional retrieved context from the vector database
-        if context_text:
-            contents.append(
-                {
-                    "role": "user",
-                    "parts": [
-                        {
-                            "text": (
-                                "Here is background context from internal ORX documents. "
-                                "Use it to answer the user's question. "
-                                "If it seems irrelevant, ignore it.\n\n"
-                                f"{context_text}"
-                            )
-                        }
-                    ],
-                }
-            )
-
-        # Past conversation messages (map 'assistant' -> 'model' for Gemini)
-        if past_messages:
-            for msg in past_messages:
-                role = "user" if msg["role"] == "user" else "model"
-                contents.append(
-                    {
-                        "role": role,
-                        "parts": [{"text": msg["content"]}],
-                    }
-                )
-
-        # Current user input
-        contents.append(
-            {
-                "role": "user",
-                "parts": [{"text": user_input}],
-            }
-        )
-
-        return contents
-
 # LLM service wrapper
 class LLMService:
     """
@@ -118,14 +38,23 @@ class LLMService:
     - returns plain text reply
     """
 
-    def __init__(self, client: genai.Client, config: Optional[LLMConfig] = None):
+    def __init__(
+        self,
+        client: genai.Client,
+        config: Optional[LLMConfig] = None,
+        prompt_cache: Optional[PromptCache] = None,
+    ):
         self.client = client
         self.config = config or LLMConfig()
+        self.prompt_cache = prompt_cache or PromptCache(client)
 
     def generate_reply(
         self,
         user_input: str,
         past_messages: Optional[List[Dict[str, str]]] = None,
+        sources: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+        deadline: float = TURN_DEADLINE_SECONDS,
     ) -> str:
         """
         Pipeline:
@@ -137,29 +66,23 @@ class LLMService:
         Args:
             user_input: The current user's question/input
             past_messages: Optional list of previous messages in format [{"role": "user"|"assistant", "content": "..."}]
+            sources: Optional list of ORX source names to scope retrieval to (None = search all sources)
+            session_id: Optional interview session id, enables Gemini context caching of the conversation prefix
+            deadline: Seconds the whole turn may take; the embedding and the reply share this one budget
         """
+        deadline_at = time.monotonic() + deadline
+
         # 1) Retrieve top-K relevant chunks from Supabase
         matches = retrieve_relevant_chunks(
             query=user_input,
             match_count=8,
             min_similarity=0.35,  # tweak as needed
+            sources=sources,
+            deadline=min(RETRIEVAL_DEADLINE_SECONDS, deadline),
         )
         
         # Turn list of rows into one context string
-        context_pieces = []
-        for m in matches:
-            content = m.get("content")
-            meta = m.get("metadata") or {}
-            src = meta.get("source", "unknown_source")
-            page = meta.get("page")
-            # You can adjust this formatting
-            header = f"[Source: {src}"
-            if page is not None:
-                header += f", page {page}"
-            header += "]"
-            context_pieces.append(f"{header}\n{content}")
-
-        context_text = "\n\n---\n\n".join(context_pieces) if context_pieces else None
+        context_text = format_context(matches)
         
         # Build prompt
         contents = LLMConfig.build_prompt_contents(
@@ -170,14 +93,59 @@ class LLMService:
         )
 
         # Call Gemini
-        response = self.client.models.generate_content(
-            model=self.config.model,
-            contents=contents,
+        response = self.complete(
+            contents,
+            prefix_len=1 + len(past_messages or []),
+            session_id=session_id,
+            deadline=deadline_at - time.monotonic(),  # whatever retrieval left over
         )
         print("RAG matches:", len(matches))
         print("First chunk:", matches[0] if matches else None)
         # For now we just want plain text
         return response.text
 
+    def complete(
+        self,
+        contents: List[Dict[str, Any]],
+        prefix_len: int,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Send a built prompt to Gemini through the shared governor (concurrency limit, deadline, retries).
+        If the session has a cached prefix, only the part after it is sent along with the cache name.
+        deadline: seconds for everything here, including a full-prompt retry after a stale cache
+        """
+        deadline_at = time.monotonic() + (deadline if deadline is not None else gemini_governor.default_deadline)
+        to_send, cached_content = self.prompt_cache.prepare(
+            session_id, self.config.model, contents, prefix_len, deadline=deadline_at - time.monotonic()
+        )
+
+        def call(send, cache_name):
+            return gemini_governor.call(
+                self.config.model,
+                lambda remaining: self.client.models.generate_content(
+                    model=self.config.model,
+                    contents=send,
+                    config=types.GenerateContentConfig(
+                        cached_content=cache_name,
+                        http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+                    ),
+                ),
+                deadline=deadline_at - time.monotonic(),
+            )
+
+        if cached_content is None:
+            return call(contents, None)
+
+        try:
+            return call(to_send, cached_content)
+        except Exception as e:
+            # Cache expired or was deleted upstream: drop it and send the whole prompt instead
+            if status_code(e) not in (400, 403, 404):
+                raise
+            self.prompt_cache.invalidate(session_id)
+            return call(contents, None)
+
 # Create and export a singleton instance
 llm_service = LLMService(client=client)
\ No newline at end of file
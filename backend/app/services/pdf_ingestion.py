@@ -1,11 +1,15 @@
 # backend/rag/ingest_pdfs.py
+# Run from backend/:  python -m app.services.pdf_ingestion
 import os
-from typing import List
+from typing import Any, Dict, Iterator, List, Tuple
 
 import pandas as pd  # not strictly needed here, but fine if shared env
 from supabase import create_client
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
+from app.services.upstream_governor import gemini_governor
+from app.services.chunking import chunk_pages
 from PyPDF2 import PdfReader  # pip install PyPDF2
 
 load_dotenv()
@@ -33,58 +37,20 @@ gemini = genai.Client(api_key=GEMINI_API_KEY)
 
 
 def get_embedding(text: str) -> List[float]:
-    """Call Gemini embedding API and return a list[float]."""
-    res = gemini.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=text,
+    """Call Gemini embedding API (through the shared governor) and return a list[float]."""
+    res = gemini_governor.call(
+        EMBEDDING_MODEL,
+        lambda remaining: gemini.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=text,
+            config=types.EmbedContentConfig(
+                http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+            ),
+        ),
     )
     return res.embeddings[0].values
 
 
-def clean_text(text: str) -> str:
-    """Basic cleanup: collapse whitespace and strip."""
-    if not text:
-        return ""
-    # Turn newlines / multiple spaces into single spaces
-    return " ".join(text.split())
-
-
-def split_text_into_chunks(
-    text: str,
-    max_chars: int = 1200,
-    overlap: int = 200,
-):
-    """
-    Split a long string into overlapping chunks of ~max_chars length.
-    Simple character-based splitter (good enough for most PDFs).
-    Yields chunks one at a time to avoid memory issues with large texts.
-    """
-    text = text.strip()
-    if not text:
-        return
-
-    start = 0
-    text_len = len(text)
-
-    while start < text_len:
-        end = min(start + max_chars, text_len)
-        chunk = text[start:end].strip()
-        if chunk:
-            yield chunk
-        
-        # If we've reached the end, break
-        if end >= text_len:
-            break
-        
-        # move start forward with some overlap, ensuring we always advance
-        new_start = end - overlap
-        if new_start <= start:
-            # Ensure we always move forward by at least 1 character
-            new_start = start + 1
-        
-        start = new_start
-
-
 def get_next_chunk_index() -> int:
     """
     Look at the existing chunks table and find the next available chunk_index.
@@ -106,50 +72,54 @@ def get_next_chunk_index() -> int:
     return max_idx + 1
 
 
+def iter_pdf_chunks(path: str, source_name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (text, metadata) for every chunk of the PDF, in a fixed order.
+    Pages are chunked together (see chunking.chunk_pages): repeated headers/footers are dropped,
+    chunks end on sentence boundaries, and short page tails are merged into the next page.
+    Shared by ingest_pdf and the background ingestion jobs (which rely on the order to resume).
+    """
+    reader = PdfReader(path)
+
+    # Header/footer detection needs every page, so extract them all first (the PDFs are small)
+    pages = [page.extract_text() or "" for page in reader.pages]
+
+    chunk_count = 0
+    current_page = None
+
+    for chunk in chunk_pages(pages):
+        if chunk["page"] != current_page:
+            current_page, chunk_count = chunk["page"], 0
+
+        yield chunk["text"], {
+            "source": source_name,
+            "page": int(chunk["page"]),
+            "page_end": int(chunk["page_end"]),  # same as page unless a short tail was merged in
+            "chunk_in_page": int(chunk_count),
+        }
+        chunk_count += 1
+
+
 def ingest_pdf(path: str, source_name: str, start_index: int = 0) -> int:
     """
     Ingest a single PDF into the `chunks` table.
-    Each PDF page is turned into 1+ text chunks depending on length.
     Returns the next chunk_index to use.
     """
     print(f"\n=== Ingesting {path} as source '{source_name}' ===")
 
-    reader = PdfReader(path)
-    num_pages = len(reader.pages)
     chunk_index = start_index
 
-    for page_num in range(num_pages):
-        page = reader.pages[page_num]
-        raw_text = page.extract_text() or ""
-        page_text = clean_text(raw_text)
+    for text, metadata in iter_pdf_chunks(path, source_name):
+        emb = get_embedding(text)
 
-        if not page_text:
-            print(f"  Page {page_num + 1}/{num_pages} has no extractable text, skipping.")
-            continue
+        supabase.table("chunks").insert({
+            "chunk_index": int(chunk_index),
+            "content": text,
+            "metadata": metadata,
+            "embedding": emb,
+        }).execute()
 
-        # Process chunks incrementally to avoid memory issues
-        page_chunks = split_text_into_chunks(page_text)
-        chunk_count = 0
-
-        for chunk_text in page_chunks:
-            emb = get_embedding(chunk_text)
-
-            supabase.table("chunks").insert({
-                "chunk_index": int(chunk_index),
-                "content": chunk_text,
-                "metadata": {
-                    "source": source_name,
-                    "page": int(page_num),
-                    "chunk_in_page": int(chunk_count),
-                },
-                "embedding": emb,
-            }).execute()
-
-            chunk_index += 1
-            chunk_count += 1
-
-        if chunk_count > 0:
-            print(f"  Page {page_num + 1}/{num_pages}: processed {chunk_count} chunks")
+        chunk_index += 1
 
     print(f"Finished {path}. Total chunks from this PDF: {chunk_index - start_index}")
     return chunk_index
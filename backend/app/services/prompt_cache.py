@@ -0,0 +1,180 @@
+# backend/app/services/prompt_cache.py
+#
+# Per-session explicit context caching for Gemini.
+# Every turn resends the system instructions plus the whole conversation so far. That prefix only
+# ever grows, so once it is long enough we store it with client.caches.create() and from then on only
+# send what comes after it (new history, retrieved context, the new answer) with cached_content=<name>.
+# Cached tokens are billed at a discount and aren't re-uploaded.
+#
+# Falls back to sending the full prompt whenever caching isn't possible: no session id, prefix too
+# short, model without caching support, cache creation failing, or the cache having expired.
+# Cache creation goes through the shared governor like every other Gemini call, with a short deadline
+# of its own (taken out of the turn's budget) since the turn can always go ahead without it.
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from .chunking import estimate_tokens
+from .upstream_governor import gemini_governor, status_code
+
+# --------- CONFIG ---------
+MIN_CACHE_TOKENS = 2048     # Gemini rejects explicit caches smaller than this (and they don't pay off)
+CACHE_TTL_SECONDS = 900     # an interview turn rarely takes longer than this
+REFRESH_RATIO = 0.5         # re-cache once the uncached part of the prefix is this share of the cached part
+CREATE_DEADLINE_SECONDS = 10.0  # most of the turn's remaining time cache creation may use
+UNSUPPORTED_STATUS = {400, 403}  # creation errors that mean "this model/prefix can't be cached"
+FAILURE_BACKOFF_SECONDS = 300   # ... after which caching is off for that model for this long
+MAX_SESSIONS = 1000
+# ---------------------------
+
+def contents_tokens(contents: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(part.get("text", "")) for c in contents for part in c["parts"])
+
+def contents_digest(contents: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(contents, sort_keys=True).encode("utf-8")).hexdigest()
+
+class CachedPrefix:
+    def __init__(self, name: str, model: str, covered: int, digest: str, tokens: int, expires_at: float):
+        self.name = name
+        self.model = model
+        self.covered = covered        # how many leading contents entries the cache holds
+        self.digest = digest          # hash of those entries, to check the prefix didn't change
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+class PromptCache:
+    """Keeps at most one live Gemini cache per interview session."""
+
+    def __init__(
+        self,
+        client: Any,
+        min_tokens: int = MIN_CACHE_TOKENS,
+        ttl_seconds: int = CACHE_TTL_SECONDS,
+        refresh_ratio: float = REFRESH_RATIO,
+        clock=time.monotonic,
+    ):
+        self.client = client
+        self.min_tokens = min_tokens
+        self.ttl_seconds = ttl_seconds
+        self.refresh_ratio = refresh_ratio
+        self.clock = clock
+
+        self._entries: Dict[str, CachedPrefix] = {}
+        self._disabled_until: Dict[str, float] = {}  # per model, after cache creation is rejected as unsupported
+        self._lock = threading.Lock()
+
+    def prepare(
+        self,
+        session_id: Optional[str],
+        model: str,
+        contents: List[Dict[str, Any]],
+        prefix_len: int,
+        deadline: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Decide what to send for this turn. contents[:prefix_len] is the stable prefix
+        (system instructions + past messages). Returns (contents to send, cached_content name or None).
+        deadline: seconds left in the turn; creating a cache uses at most CREATE_DEADLINE_SECONDS of it.
+        """
+        if session_id is None or self.clock() < self._disabled_until.get(model, 0):
+            return contents, None
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+
+        if entry is not None and not self._still_valid(entry, model, contents, prefix_len):
+            self.invalidate(session_id)
+            entry = None
+
+        prefix_tokens = contents_tokens(contents[:prefix_len])
+        if entry is not None:
+            uncached = prefix_tokens - entry.tokens
+            if uncached <= entry.tokens * self.refresh_ratio:
+                return contents[entry.covered:], entry.name
+
+        if prefix_tokens < self.min_tokens:
+            return (contents[entry.covered:], entry.name) if entry else (contents, None)
+
+        create_deadline = CREATE_DEADLINE_SECONDS if deadline is None else min(CREATE_DEADLINE_SECONDS, deadline)
+        entry = self._create(session_id, model, contents[:prefix_len], prefix_tokens, create_deadline) or entry
+        if entry is None:
+            return contents, None
+        return contents[entry.covered:], entry.name
+
+    def invalidate(self, session_id: str) -> None:
+        """Forget a session's cache (e.g. Gemini says it expired). Deleting it upstream is best effort."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            try:
+                self.client.caches.delete(name=entry.name)
+            except Exception:
+                pass  # it expires on its own anyway
+
+    def _still_valid(self, entry: CachedPrefix, model: str, contents: List[Dict[str, Any]], prefix_len: int) -> bool:
+        return (
+            entry.model == model
+            and self.clock() < entry.expires_at
+            and entry.covered <= prefix_len
+            and contents_digest(contents[:entry.covered]) == entry.digest
+        )
+
+    def _create(
+        self,
+        session_id: str,
+        model: str,
+        prefix: List[Dict[str, Any]],
+        tokens: int,
+        deadline: float,
+    ) -> Optional[CachedPrefix]:
+        try:
+            # Same limiter key as the replies: cache creation counts against the model's capacity
+            cache = gemini_governor.call(
+                model,
+                lambda remaining: self.client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        contents=prefix,
+                        ttl=f"{self.ttl_seconds}s",
+                        display_name=f"interview-{session_id}",
+                        http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+                    ),
+                ),
+                deadline=deadline,
+            )
+        except Exception as e:
+            if status_code(e) in UNSUPPORTED_STATUS:
+                # Model without caching support, prefix below the real minimum... send full prompts for a while
+                print(f"Prompt cache unavailable for {model}, sending full prompts: {e}")
+                self._disabled_until[model] = self.clock() + FAILURE_BACKOFF_SECONDS
+            else:
+                # Throttling / 5xx / timeouts the governor couldn't retry away: skip caching for this turn only
+                print(f"Prompt cache creation failed for session {session_id}, sending the full prompt: {e}")
+            return None
+
+        entry = CachedPrefix(
+            name=cache.name,
+            model=model,
+            covered=len(prefix),
+            digest=contents_digest(prefix),
+            tokens=tokens,
+            expires_at=self.clock() + self.ttl_seconds - 30,  # small margin so we never use a cache as it expires
+        )
+
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if len(self._entries) >= MAX_SESSIONS:
+                self._entries.pop(next(iter(self._entries)))  # drop the oldest, it expires upstream on its own
+            self._entries[session_id] = entry
+
+        if previous is not None:
+            try:
+                self.client.caches.delete(name=previous.name)
+            except Exception:
+                pass
+        return entry
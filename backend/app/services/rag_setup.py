@@ -1,8 +1,10 @@
 from google import genai
-from typing import List
+from google.genai import types
+from typing import List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 from data.database import supabase
+from .upstream_governor import gemini_governor
 
 load_dotenv()
 
@@ -11,51 +13,87 @@ EMBEDDING_MODEL = "models/text-embedding-004"
 # Create a separate client for embeddings to avoid circular import
 embedding_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
-def get_embedding(text: str) -> list[float]:
+def get_embedding(text: str, deadline: Optional[float] = None) -> list[float]:
     # You can also strip/normalize text here
-    res = embedding_client.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=text,
+    # Embeddings share the governor with chat replies, each model has its own limit.
+    # deadline: seconds this call may take in total (None = the governor's default)
+    res = gemini_governor.call(
+        EMBEDDING_MODEL,
+        lambda remaining: embedding_client.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=text,
+            config=types.EmbedContentConfig(
+                http_options=types.HttpOptions(timeout=int(remaining * 1000)),
+            ),
+        ),
+        deadline=deadline,
     )
     return res.embeddings[0].values
 
-def chunk_text(text: str, max_chars: int = 800, overlap: int = 200) -> List[str]:
-    text = text.strip()
-    if not text:
-        return []
-
-    chunks = []
-    start = 0
-    n = len(text)
-
-    while start < n:
-        end = min(start + max_chars, n)
-        chunk = text[start:end]
-        chunks.append(chunk)
-        if end == n:
-            break
-        start = max(0, end - overlap)
-
-    return chunks
-
 def retrieve_relevant_chunks(
     query: str,
     match_count: int = 8,
     min_similarity: float = 0.3,
+    sources: Optional[List[str]] = None,
+    sheet: Optional[str] = None,
+    page_range: Optional[Tuple[int, int]] = None,
+    deadline: Optional[float] = None,
 ) -> list[dict]:
     """
     Use pgvector + Supabase SQL function `match_chunks` to find the most relevant
     rows in the `chunks` table for this query.
+
+    Optional filters scope the search to part of the corpus:
+    - sources: metadata.source names (e.g. ["ORX_RCL_2022", "ORX_GUIDANCE_PDF"])
+    - sheet: Excel sheet name
+    - page_range: (first, last) PDF page, inclusive, 0-based as stored
+    Filtered queries go to `match_chunks_filtered` (data/sql/match_chunks_filtered.sql),
+    which only scans the per-source partitions that were asked for.
+
+    deadline: seconds the query embedding may take (passed on to get_embedding)
     """
-    query_embedding = get_embedding(query)
+    query_embedding = get_embedding(query, deadline=deadline)
+
+    if not sources and sheet is None and page_range is None:
+        resp = supabase.rpc(
+            "match_chunks",  # name of your SQL function in Postgres
+            {
+                "query_embedding": query_embedding,
+                "match_count": match_count,
+                "match_threshold": min_similarity,
+            },
+        ).execute()
+        return resp.data or []
 
+    page_from, page_to = page_range if page_range is not None else (None, None)
     resp = supabase.rpc(
-        "match_chunks",  # name of your SQL function in Postgres
+        "match_chunks_filtered",
         {
             "query_embedding": query_embedding,
             "match_count": match_count,
             "match_threshold": min_similarity,
+            "filter_sources": sources or None,
+            "filter_sheet": sheet,
+            "page_from": page_from,
+            "page_to": page_to,
         },
     ).execute()
 
-    return resp.data or []
\ No newline at end of file
+    return resp.data or []
+
+def format_context(matches: list[dict]) -> Optional[str]:
+    """Turn matched chunk rows into one context string for the prompt (None if nothing matched)."""
+    context_pieces = []
+    for m in matches:
+        content = m.get("content")
+        meta = m.get("metadata") or {}
+        src = meta.get("source", "unknown_source")
+        page = meta.get("page")
+        # You can adjust this formatting
+        header = f"[Source: {src}"
+        if page is not None:
+            header += f", page {page}"
+        header += "]"
+        context_pieces.append(f"{header}\n{content}")
+
+    return "\n\n---\n\n".join(context_pieces) if context_pieces else None
@@ -0,0 +1,157 @@
+# backend/app/services/session_export.py
+#
+# Streams every chat session and its transcript as NDJSON (optionally gzip-compressed) for auditors.
+# Pages through chat_sessions / chat_messages so memory stays bounded no matter how much is stored.
+#
+# CLI (run from backend/):
+#   python -m app.services.session_export --start 2025-01-01 --end 2025-07-01 --gzip -o export.ndjson.gz
+
+import argparse
+import sys
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pydantic import TypeAdapter
+
+from app.schema.schemas import ExportedSession, ExportedMessage
+from data.database import supabase
+
+# --------- CONFIG ---------
+SESSION_PAGE_SIZE = 200   # sessions fetched per round trip
+MESSAGE_PAGE_SIZE = 500   # messages fetched per round trip
+# ---------------------------
+# Paging only stops on an empty page, never on a short one: PostgREST silently caps every response at
+# the project's max-rows setting, so a page can come back shorter than asked without being the last.
+
+exported_session_adapter = TypeAdapter(ExportedSession)
+exported_message_adapter = TypeAdapter(ExportedMessage)
+
+def iter_session_pages(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    page_size: int = SESSION_PAGE_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of chat_sessions rows ordered by id, optionally limited to start <= created_at < end.
+    Uses keyset pagination (id > last id seen) so later pages cost the same as the first one.
+    Stops on the first empty page (see the note under CONFIG).
+    """
+    last_id = None
+    while True:
+        query = supabase.table("chat_sessions").select("id, created_at")
+        if start is not None:
+            query = query.gte("created_at", start.isoformat())
+        if end is not None:
+            query = query.lt("created_at", end.isoformat())
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        rows = query.order("id").limit(page_size).execute().data or []
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1]["id"]
+
+def iter_message_rows(session_ids: List[str], page_size: int = MESSAGE_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield chat_messages rows for a page of sessions, grouped by session (same id order as
+    iter_session_pages) and in conversation order within each session.
+    Keyset pagination on (session_id, created_at, role desc, id): each page starts strictly after the
+    last row seen, so messages written while the export runs can't shift pages and duplicate or skip rows.
+    Stops on the first empty page (see the note under CONFIG).
+    """
+    last = None
+    while True:
+        query = (
+            supabase
+            .table("chat_messages")
+            .select("id, session_id, role, content, created_at")
+            .in_("session_id", session_ids)
+        )
+        if last is not None:
+            # Rows after `last` in the sort order below; role is descending, hence role.lt
+            sid, created, role, mid = (f'"{last[key]}"' for key in ("session_id", "created_at", "role", "id"))
+            query = query.or_(
+                f"session_id.gt.{sid},"
+                f"and(session_id.eq.{sid},created_at.gt.{created}),"
+                f"and(session_id.eq.{sid},created_at.eq.{created},role.lt.{role}),"
+                f"and(session_id.eq.{sid},created_at.eq.{created},role.eq.{role},id.gt.{mid})"
+            )
+
+        rows = (
+            query
+            .order("session_id")
+            .order("created_at")
+            .order("role", desc=True)  # legacy rows: the answer and its feedback share one timestamp
+            .order("id")               # makes the sort key unique
+            .limit(page_size)
+            .execute()
+        ).data or []
+
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]
+
+def iter_export_lines(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[bytes]:
+    """
+    Yield one NDJSON line (bytes, newline terminated) per session and per message.
+    Each session line comes right before its own messages.
+    """
+    for sessions in iter_session_pages(start, end):
+        pending = iter(sessions)
+        current = None
+
+        # Messages come back in the same session order as the page, so we can walk both lists together
+        for row in iter_message_rows([s["id"] for s in sessions]):
+            while current is None or current["id"] != row["session_id"]:
+                current = next(pending, None)
+                if current is None:
+                    # Would otherwise surface as a bare StopIteration -> RuntimeError and a truncated file
+                    raise RuntimeError(
+                        f"Export out of order: message {row['id']} belongs to session {row['session_id']}, "
+                        "which is not in the remaining sessions of this page"
+                    )
+                yield exported_session_adapter.dump_json(exported_session_adapter.validate_python(current)) + b"\n"
+            yield exported_message_adapter.dump_json(exported_message_adapter.validate_python(row)) + b"\n"
+
+        # Sessions without any messages (or after the last one that had some)
+        for rest in pending:
+            yield exported_session_adapter.dump_json(exported_session_adapter.validate_python(rest)) + b"\n"
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally (wbits=31 writes the gzip header/trailer)."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export chat sessions and transcripts as NDJSON.")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="only sessions created at or after this time (ISO 8601)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="only sessions created before this time (ISO 8601)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    chunks = iter_export_lines(args.start, args.end)
+    if args.gzip:
+        chunks = gzip_chunks(chunks)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# backend/app/services/upstream_governor.py
+#
+# Shared guard around every call we make to Gemini (chat replies and embeddings).
+# - per-model concurrency limit that adapts AIMD-style: grows slowly while calls succeed,
+#   halves on a 429 and eases off when latency goes over target
+# - a bounded wait queue: when it is full, new calls are shed right away instead of piling up
+# - an overall deadline per call (queue wait + every attempt + backoff) with jittered retries
+#
+# Callers get UpstreamOverloaded / UpstreamTimeout instead of a hung request.
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+# --------- CONFIG ---------
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Per-model limiter settings. Anything not listed uses DEFAULT_LIMITS.
+MODEL_LIMITS: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-flash-lite": {"initial": 4, "max_limit": 16, "latency_target": 15.0},
+    "models/text-embedding-004": {"initial": 8, "max_limit": 32, "latency_target": 3.0},
+}
+DEFAULT_LIMITS: Dict[str, float] = {"initial": 4, "max_limit": 16, "latency_target": 15.0}
+# ---------------------------
+
+class UpstreamError(Exception):
+    """Base class for errors raised by the governor itself (not by Gemini)."""
+
+class UpstreamOverloaded(UpstreamError):
+    """The call was shed: the wait queue was full, or Gemini kept throttling after every retry."""
+
+class UpstreamTimeout(UpstreamError):
+    """The call's deadline ran out (waiting for a slot, in the request, or before the next retry)."""
+
+def status_code(error: Exception) -> Optional[int]:
+    # google.genai.errors.APIError carries the HTTP status as .code
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+def is_throttled(error: Exception) -> bool:
+    return status_code(error) == 429
+
+def is_retryable(error: Exception) -> bool:
+    return status_code(error) in RETRYABLE_STATUS or isinstance(error, httpx.TimeoutException)
+
+class AIMDLimiter:
+    """
+    Concurrency limit for one model.
+    Additive increase: +1 slot per `limit` successful calls (about +1 per round of calls).
+    Multiplicative decrease: x`decrease` on a 429, x`latency_decrease` when a call is slower than `latency_target`.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 16,
+        decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+        latency_decrease: float = 0.9,
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.latency_decrease = latency_decrease
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self, timeout: float, max_queue: int) -> None:
+        """Take a slot, waiting at most `timeout` seconds. Raises instead of waiting when the queue is full."""
+        with self._cond:
+            if self._has_slot():
+                self.in_flight += 1
+                return
+
+            if self.waiting >= max_queue:
+                raise UpstreamOverloaded(
+                    f"{self.in_flight} calls in flight (limit {int(self.limit)}) and {self.waiting} queued"
+                )
+
+            self.waiting += 1
+            try:
+                got_slot = self._cond.wait_for(self._has_slot, timeout=max(timeout, 0))
+            finally:
+                self.waiting -= 1
+
+            if not got_slot:
+                raise UpstreamTimeout(f"no free slot within {timeout:.1f}s (limit {int(self.limit)})")
+            self.in_flight += 1
+
+    def release(self, outcome: str, latency: float) -> None:
+        """Give the slot back and adjust the limit. outcome: 'ok' | 'throttled' | 'error'."""
+        with self._cond:
+            self.in_flight -= 1
+
+            if outcome == "throttled":
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+            elif outcome == "ok":
+                if self.latency_target is not None and latency > self.latency_target:
+                    self.limit = max(self.min_limit, self.limit * self.latency_decrease)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            # Other errors say nothing about capacity, so the limit stays put
+
+            self._cond.notify_all()
+
+class UpstreamGovernor:
+    """
+    One limiter per model key, plus the retry/deadline policy shared by all of them.
+    `sleep` and `clock` can be swapped out for simulations.
+    """
+
+    def __init__(
+        self,
+        model_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        max_queue: int = 32,
+        max_attempts: int = 4,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        default_deadline: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model_limits = model_limits if model_limits is not None else MODEL_LIMITS
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.default_deadline = default_deadline
+        self.sleep = sleep
+        self.clock = clock
+
+        self._limiters: Dict[str, AIMDLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, key: str) -> AIMDLimiter:
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = AIMDLimiter(**self.model_limits.get(key, DEFAULT_LIMITS))
+            return self._limiters[key]
+
+    def call(self, key: str, fn: Callable[[float], Any], deadline: Optional[float] = None) -> Any:
+        """
+        Run fn(remaining_seconds) under the limiter for `key`, retrying throttling / 5xx / timeouts
+        with full-jitter exponential backoff until `deadline` seconds have passed.
+        fn gets the time left so it can pass it on as the HTTP timeout of the request.
+        """
+        limiter = self.limiter(key)
+        deadline_at = self.clock() + (deadline if deadline is not None else self.default_deadline)
+
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = deadline_at - self.clock()
+            if remaining <= 0:
+                raise UpstreamTimeout(f"{key}: deadline exceeded after {attempt - 1} attempts")
+
+            limiter.acquire(timeout=remaining, max_queue=self.max_queue)
+            started = self.clock()
+            try:
+                result = fn(deadline_at - started)
+            except Exception as e:
+                limiter.release("throttled" if is_throttled(e) else "error", self.clock() - started)
+                if not is_retryable(e):
+                    raise
+
+                if attempt == self.max_attempts:
+                    if is_throttled(e):
+                        raise UpstreamOverloaded(f"{key}: still throttled after {attempt} attempts") from e
+                    raise
+
+                backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+                if self.clock() + backoff >= deadline_at:
+                    raise UpstreamTimeout(f"{key}: deadline exceeded after {attempt} attempts") from e
+                self.sleep(backoff)
+                continue
+
+            limiter.release("ok", self.clock() - started)
+            return result
+
+# Shared instance used by every Gemini call in the backend
+gemini_governor = UpstreamGovernor()
@@ -0,0 +1,30 @@
+-- Deletes a batch of chat sessions (and their messages) in one round trip.
+-- Called from the backend with supabase.rpc("delete_chat_sessions", {"session_ids": [...]}).
+-- Returns the ids that were actually deleted; any requested id not returned did not exist.
+-- The ids come back as a single array value, not one row each: PostgREST caps function results at
+-- max-rows (1000 on Supabase), which would otherwise cut off the list for large batches.
+-- Runs in the Supabase SQL editor, same as match_chunks.
+
+-- The return type changed from a table of rows to text[], which create or replace can't do
+drop function if exists delete_chat_sessions(text[]);
+
+create or replace function delete_chat_sessions(session_ids text[])
+returns text[]
+language plpgsql
+as $$
+declare
+  deleted_ids text[];
+begin
+  -- Messages first, to satisfy the chat_messages.session_id foreign key
+  delete from chat_messages where session_id = any(session_ids);
+
+  with deleted as (
+    delete from chat_sessions
+    where chat_sessions.id = any(session_ids)
+    returning chat_sessions.id
+  )
+  select coalesce(array_agg(deleted.id), '{}') into deleted_ids from deleted;
+
+  return deleted_ids;
+end;
+$$;
@@ -0,0 +1,51 @@
+-- Background ingestion jobs (app/services/ingestion_jobs.py).
+-- One row per job; the worker updates checkpoint / chunks_done / updated_at after every committed batch,
+-- so a restarted backend resumes from the last committed chunk instead of starting over.
+-- Runs in the Supabase SQL editor, same as match_chunks.
+
+create table if not exists ingestion_jobs (
+  id text primary key,
+  status text not null default 'queued',     -- queued | running | interrupted | completed | failed
+  sources jsonb not null,                    -- source names to ingest, in order
+  checkpoint jsonb,                          -- last committed position, see ingestion_jobs.py
+  chunks_done int not null default 0,
+  total_chunks int,
+  run_started_at timestamptz,                -- start of the current run (for throughput / ETA)
+  run_start_chunks int not null default 0,   -- chunks_done when the current run started
+  error text,
+  created_at timestamptz not null default now(),
+  updated_at timestamptz not null default now()
+);
+
+-- Lets a resumed job remove chunks it inserted after its last checkpoint
+create index if not exists chunks_metadata_job_id on chunks ((metadata->>'job_id'));
+
+-- chunk_index ranges for job batches. Every batch reserves its range here before inserting, so jobs
+-- running in different backend processes never hand out the same chunk_index.
+-- Called with supabase.rpc("reserve_chunk_indexes", {"n": <batch size>}); returns the first index of the range.
+-- The counter never falls behind max(chunk_index) + 1, so chunks added by the standalone
+-- ingestion scripts are skipped over as well.
+create table if not exists chunk_index_counter (
+  id boolean primary key default true check (id),  -- single row
+  next_index bigint not null
+);
+
+create or replace function reserve_chunk_indexes(n int)
+returns bigint
+language plpgsql
+as $$
+declare
+  first_index bigint;
+begin
+  insert into chunk_index_counter (id, next_index) values (true, 0)
+  on conflict (id) do nothing;
+
+  -- The row lock taken by this update serializes concurrent reservations
+  update chunk_index_counter
+  set next_index = greatest(next_index, (select coalesce(max(chunk_index) + 1, 0) from chunks)) + n
+  where id
+  returning next_index - n into first_index;
+
+  return first_index;
+end;
+$$;
@@ -0,0 +1,70 @@
+-- Source-scoped version of match_chunks.
+-- Called from rag_setup.retrieve_relevant_chunks when the caller passes source / sheet / page filters;
+-- unfiltered queries keep using match_chunks.
+-- Runs in the Supabase SQL editor, same as match_chunks.
+
+-- ********** Per-source partitions **********
+-- One partial HNSW index per ORX source, so a scoped query only walks the graph for its own slice
+-- instead of searching all nine sources and throwing most of the hits away.
+-- Add a line here when a new source is ingested.
+create index if not exists chunks_embedding_orx_rcl_2022 on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_RCL_2022');
+create index if not exists chunks_embedding_orx_cause_impact on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_Cause_Impact');
+create index if not exists chunks_embedding_orx_eba_mapping on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_EBA_Mapping');
+create index if not exists chunks_embedding_orx_results_report on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_Results_Report_DEC_PDF');
+create index if not exists chunks_embedding_orx_library_report on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_LIBRARY_REPORT_PDF');
+create index if not exists chunks_embedding_orx_guidance on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_GUIDANCE_PDF');
+create index if not exists chunks_embedding_orx_event_type on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_EVENT_TYPE_REFERENCE_TAXONOMY_2019_PDF');
+create index if not exists chunks_embedding_orx_controls_practices on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_CONTROLS_PRACTICES_PAPER_PDF');
+create index if not exists chunks_embedding_orx_cause_impacts_2020 on chunks using hnsw (embedding vector_cosine_ops) where (metadata->>'source' = 'ORX_CAUSE_IMPACTS_REFERENCE_TAXONOMY_2020_PDF');
+
+-- ********** Filtered match **********
+-- Each requested source becomes its own branch with the source name as a literal, which is what lets
+-- the planner pick that source's partial index. Branches are merged by similarity at the end.
+create or replace function match_chunks_filtered(
+  query_embedding vector(768),
+  match_count int,
+  match_threshold float,
+  filter_sources text[] default null,  -- null / empty = all sources
+  filter_sheet text default null,      -- Excel sheet name
+  page_from int default null,          -- PDF page range, inclusive (0-based, as stored)
+  page_to int default null
+)
+returns table (id bigint, chunk_index int, content text, metadata jsonb, similarity float)
+language plpgsql
+stable
+as $$
+declare
+  extra_filters text := '';
+  branch_template text;
+  branches text[] := '{}';
+  src text;
+begin
+  if filter_sheet is not null then
+    extra_filters := extra_filters || format(' and c.metadata->>''sheet'' = %L', filter_sheet);
+  end if;
+  if page_from is not null then
+    extra_filters := extra_filters || format(' and (c.metadata->>''page'')::int >= %s', page_from);
+  end if;
+  if page_to is not null then
+    extra_filters := extra_filters || format(' and (c.metadata->>''page'')::int <= %s', page_to);
+  end if;
+
+  branch_template :=
+    '(select c.id, c.chunk_index, c.content, c.metadata, 1 - (c.embedding <=> $1) as similarity '
+    'from chunks c where %s%s order by c.embedding <=> $1 limit $2)';
+
+  if filter_sources is null or cardinality(filter_sources) = 0 then
+    branches := array[format(branch_template, 'true', extra_filters)];
+  else
+    foreach src in array filter_sources loop
+      branches := branches || format(branch_template, format('c.metadata->>''source'' = %L', src), extra_filters);
+    end loop;
+  end if;
+
+  return query execute format(
+    'select * from (%s) m where m.similarity > $3 order by m.similarity desc limit $2',
+    array_to_string(branches, ' union all ')
+  )
+  using query_embedding, match_count, match_threshold;
+end;
+$$;
@@ -0,0 +1,144 @@
+# backend/scripts/bench_session_serialization.py
+#
+# Microbenchmark for the session response fast path.
+# Compares the old route body (build Message/Session objects, let FastAPI re-validate via response_model)
+# against the new one (validate raw rows once, dump JSON bytes directly) on a 2,000-message session.
+# Byte-identical output is checked end to end through TestClient; timings cover only the
+# build + validate + serialize work, since the HTTP round trip in TestClient is mostly noise.
+#
+# Run from backend/:  python -m scripts.bench_session_serialization
+# Needs httpx for FastAPI's TestClient (pip install httpx).
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_model_field
+
+from app.schema.schemas import (
+    Message,
+    Session,
+    SessionSummary,
+    session_rows_to_json,
+    session_summary_rows_to_json,
+)
+
+# --------- CONFIG ---------
+NUM_MESSAGES = 2000
+NUM_SESSIONS = 2000
+ROUNDS = 30
+# ---------------------------
+
+def make_rows():
+    """Fake Supabase rows, shaped exactly like chat_sessions / chat_messages rows."""
+    start = datetime(2025, 11, 1, 9, 30, tzinfo=timezone.utc)
+    session_row = {"id": "sess_bench001", "created_at": start.isoformat()}
+    message_rows = [
+        {
+            "id": f"msg_{i:08x}",
+            "session_id": session_row["id"],
+            "role": "user" if i % 2 == 0 else "assistant",
+            # Mix in non-ASCII and escapes so byte-for-byte comparison is meaningful
+            "content": f"Turn {i}: describe how control C-{i} is tested.\nRéponse « {i} » \"quoted\" \t tab",
+            "created_at": (start + timedelta(seconds=i, microseconds=i * 7)).isoformat(),
+        }
+        for i in range(NUM_MESSAGES)
+    ]
+    summary_rows = [
+        {"id": f"sess_{i:08x}", "created_at": (start - timedelta(minutes=i)).isoformat()}
+        for i in range(NUM_SESSIONS)
+    ]
+    return session_row, message_rows, summary_rows
+
+# ***** Old path (what the routes did before) *****
+def old_session_body(session_row, message_rows):
+    messages = [
+        Message(id=m["id"], role=m["role"], content=m["content"], createdAt=m["created_at"])
+        for m in message_rows
+    ]
+    return Session(id=session_row["id"], createdAt=session_row["created_at"], messages=messages)
+
+def old_sessions_body(summary_rows):
+    return [SessionSummary(id=row["id"], createdAt=row["created_at"]) for row in summary_rows]
+
+def build_app(session_row, message_rows, summary_rows) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/old/session", response_model=Session)
+    async def old_session():
+        return old_session_body(session_row, message_rows)
+
+    @app.get("/old/sessions", response_model=List[SessionSummary])
+    async def old_sessions():
+        return old_sessions_body(summary_rows)
+
+    # ***** New path (what the routes do now) *****
+    @app.get("/new/session", response_model=Session)
+    async def new_session():
+        return Response(content=session_rows_to_json(session_row, message_rows), media_type="application/json")
+
+    @app.get("/new/sessions", response_model=List[SessionSummary])
+    async def new_sessions():
+        return Response(content=session_summary_rows_to_json(summary_rows), media_type="application/json")
+
+    return app
+
+def median_ms(fn) -> float:
+    fn()  # warm up
+    timings = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def old_path(response_type, build_body):
+    """What FastAPI does with a returned model: validate against response_model, then render with json.dumps."""
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+
+    def run():
+        content = asyncio.run(serialize_response(field=field, response_content=build_body()))
+        return JSONResponse(content).body
+
+    return run
+
+def main():
+    session_row, message_rows, summary_rows = make_rows()
+    client = TestClient(build_app(session_row, message_rows, summary_rows))
+
+    cases = [
+        (
+            "session",
+            old_path(Session, lambda: old_session_body(session_row, message_rows)),
+            lambda: session_rows_to_json(session_row, message_rows),
+        ),
+        (
+            "sessions",
+            old_path(List[SessionSummary], lambda: old_sessions_body(summary_rows)),
+            lambda: session_summary_rows_to_json(summary_rows),
+        ),
+    ]
+
+    for name, old_fn, new_fn in cases:
+        old = client.get(f"/old/{name}")
+        new = client.get(f"/new/{name}")
+        # The fast path must not change a single byte of what the frontend receives
+        assert old.content == new.content, f"/{name}: fast path output differs from response_model output"
+        assert old.headers["content-type"] == new.headers["content-type"]
+        assert old_fn() == new_fn() == new.content
+
+        old_ms = median_ms(old_fn)
+        new_ms = median_ms(new_fn)
+        print(
+            f"{name:<9} ({len(new.content):>8} bytes)  "
+            f"old: {old_ms:7.2f} ms   new: {new_ms:7.2f} ms   speedup: {old_ms / new_ms:4.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# backend/scripts/report_chunking.py
+#
+# Before/after report for the PDF chunker on data/pdf/*.pdf:
+#   before - the old per-page character window (1200 chars, 200 overlap, never crosses pages)
+#   after  - app/services/chunking.chunk_pages
+# Reports total chunks, embedded characters (what we pay to embed), tiny chunks, and a retrieval
+# check: fixed-length word windows sampled from each page are used as queries, and a query counts as
+# a hit when one of the top-k chunks holds at least PROBE_COVERAGE of its words. The windows start at
+# arbitrary word offsets, so neither chunker's boundaries line up with them by construction.
+# Ranking is TF-IDF by default (no API calls); --embed uses Gemini embeddings.
+#
+# Limitation: the probes are still verbatim document text, so this measures whether a passage lands
+# intact in a retrievable chunk, not how well paraphrased questions are answered.
+#
+# Run from backend/:  python -m scripts.report_chunking [--embed]
+
+import argparse
+import glob
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, List
+
+from PyPDF2 import PdfReader
+
+from app.services.chunking import chunk_pages, clean_text, strip_repeated_lines
+
+# --------- CONFIG ---------
+PDF_GLOB = "data/pdf/*.pdf"
+TOP_K = 4
+PROBE_WORDS = 24           # words per query window
+PROBE_STRIDE = 61          # a new window starts every N words of a page (not aligned to sentences or chunks)
+PROBE_COVERAGE = 0.9       # share of a window's words one retrieved chunk must contain to count as a hit
+TINY_CHARS = 300           # chunks shorter than this count as "tiny"
+# ---------------------------
+
+def legacy_chunks(pages: List[str], max_chars: int = 1200, overlap: int = 200) -> List[str]:
+    """The old pdf_ingestion.split_text_into_chunks, applied page by page."""
+    chunks = []
+    for raw in pages:
+        text = clean_text(raw)
+        start = 0
+        while start < len(text):
+            end = min(start + max_chars, len(text))
+            chunks.append(text[start:end].strip())
+            if end >= len(text):
+                break
+            start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+def new_chunks(pages: List[str]) -> List[str]:
+    return [c["text"] for c in chunk_pages(pages)]
+
+# ********** Retrieval scoring **********
+
+WORD = re.compile(r"[a-z0-9]+")
+
+def tfidf_ranker(chunks: List[str]) -> Callable[[str], List[int]]:
+    docs = [Counter(WORD.findall(c.lower())) for c in chunks]
+    df = Counter(term for d in docs for term in d)
+    idf = {t: math.log(len(docs) / n) + 1 for t, n in df.items()}
+
+    def weigh(counts: Counter) -> Dict[str, float]:
+        vec = {t: c * idf.get(t, 0.0) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    vectors = [weigh(d) for d in docs]
+
+    def rank(query: str) -> List[int]:
+        q = weigh(Counter(WORD.findall(query.lower())))
+        scores = [sum(w * v.get(t, 0.0) for t, w in q.items()) for v in vectors]
+        return sorted(range(len(chunks)), key=lambda i: -scores[i])[:TOP_K]
+
+    return rank
+
+def embedding_ranker(chunks: List[str]) -> Callable[[str], List[int]]:
+    from app.services.rag_setup import get_embedding
+
+    vectors = [get_embedding(c) for c in chunks]
+
+    def rank(query: str) -> List[int]:
+        q = get_embedding(query)
+        scores = [sum(a * b for a, b in zip(q, v)) for v in vectors]
+        return sorted(range(len(chunks)), key=lambda i: -scores[i])[:TOP_K]
+
+    return rank
+
+def probe_windows(pages: List[str]) -> List[str]:
+    # Body text only (a running footer isn't something anyone asks about); windows stay within one page,
+    # since the old chunker never crossed pages and shouldn't be penalised for that
+    probes = []
+    for page in strip_repeated_lines(pages):
+        words = clean_text(page).split(" ")
+        for start in range(0, len(words) - PROBE_WORDS + 1, PROBE_STRIDE):
+            probes.append(" ".join(words[start:start + PROBE_WORDS]))
+    return probes
+
+def covers(chunk: str, probe: str) -> bool:
+    have = Counter(WORD.findall(chunk.lower()))
+    want = Counter(WORD.findall(probe.lower()))
+    found = sum(min(n, have[t]) for t, n in want.items())
+    return found >= PROBE_COVERAGE * sum(want.values())
+
+def hit_rate(chunks: List[str], probes: List[str], make_ranker) -> float:
+    rank = make_ranker(chunks)
+    hits = sum(any(covers(chunks[i], p) for i in rank(p)) for p in probes)
+    return hits / len(probes) if probes else 0.0
+
+# ********** Report **********
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old and new PDF chunkers.")
+    parser.add_argument("--embed", action="store_true", help="score retrieval with Gemini embeddings (makes API calls)")
+    args = parser.parse_args()
+    make_ranker = embedding_ranker if args.embed else tfidf_ranker
+
+    totals = {"before": Counter(), "after": Counter()}
+    print(f"{'PDF':<48} {'':>6} {'chunks':>7} {'chars':>8} {'tiny':>5} {'hit@' + str(TOP_K):>7}")
+
+    for path in sorted(glob.glob(PDF_GLOB)):
+        pages = [page.extract_text() or "" for page in PdfReader(path).pages]
+        probes = probe_windows(pages)
+
+        for label, chunker in (("before", legacy_chunks), ("after", new_chunks)):
+            chunks = chunker(pages)
+            chars = sum(len(c) for c in chunks)
+            tiny = sum(len(c) < TINY_CHARS for c in chunks)
+            hits = hit_rate(chunks, probes, make_ranker)
+
+            t = totals[label]
+            t.update({"chunks": len(chunks), "chars": chars, "tiny": tiny, "probes": len(probes)})
+            t["hits"] += round(hits * len(probes))
+
+            name = path.split("/")[-1][:46] if label == "before" else ""
+            print(f"{name:<48} {label:>6} {len(chunks):>7} {chars:>8} {tiny:>5} {hits:>7.1%}")
+
+    print()
+    for label, t in totals.items():
+        print(
+            f"{'TOTAL':<48} {label:>6} {t['chunks']:>7} {t['chars']:>8} {t['tiny']:>5} "
+            f"{t['hits'] / max(t['probes'], 1):>7.1%}"
+        )
+
+    before, after = totals["before"], totals["after"]
+    print(
+        f"\nChunks {before['chunks']} -> {after['chunks']} ({after['chunks'] / before['chunks'] - 1:+.0%}), "
+        f"embedded chars {before['chars']} -> {after['chars']} ({after['chars'] / before['chars'] - 1:+.0%})"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/scripts/simulate_prompt_cache.py
+#
+# Checks what prompt prefix caching saves, against a local fake of the Gemini client
+# (models.generate_content + caches.create/delete) that counts tokens the way Gemini bills them:
+# uncached input at full price, cached input at CACHED_PRICE, cache creation at full price once.
+# Runs the same interview three ways: no session id (no caching), caching, and a provider
+# that rejects caches (must fall back to full prompts).
+#
+# Run from backend/:  python -m scripts.simulate_prompt_cache
+# Imports the LLM service, so the usual .env must be present (no real API calls are made).
+
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from app.services.llm_service import LLMConfig, LLMService
+from app.services.prompt_cache import PromptCache, contents_tokens
+
+# --------- CONFIG ---------
+TURNS = 30
+ANSWER_WORDS = 120     # per user answer
+REPLY_WORDS = 200      # per interviewer reply
+CONTEXT_CHUNKS = 8     # retrieved chunks per turn (~300 tokens each, different every turn)
+CACHED_PRICE = 0.25    # cached tokens cost 25% of normal input tokens
+# ---------------------------
+
+class FakeAPIError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeCachingGemini:
+    def __init__(self, supports_caching: bool = True):
+        self.supports_caching = supports_caching
+        self.caches_by_name: Dict[str, int] = {}
+        self.caches_created = 0
+        self.sent_tokens = 0
+        self.billed_tokens = 0.0
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+        self.caches = SimpleNamespace(create=self.create_cache, delete=self.delete_cache)
+
+    def generate_content(self, model: str, contents: List[Dict[str, Any]], config: Any = None):
+        sent = contents_tokens(contents)
+        cached = 0
+        if config is not None and config.cached_content:
+            if config.cached_content not in self.caches_by_name:
+                raise FakeAPIError(404, "cached content not found")
+            cached = self.caches_by_name[config.cached_content]
+
+        self.calls += 1
+        self.sent_tokens += sent
+        self.billed_tokens += sent + cached * CACHED_PRICE
+        return SimpleNamespace(text=" ".join(["reply"] * REPLY_WORDS))
+
+    def create_cache(self, model: str, config: Any):
+        if not self.supports_caching:
+            raise FakeAPIError(400, "explicit caching not supported for this model")
+        # The real config turns our dicts into types.Content objects
+        tokens = contents_tokens([c.model_dump(exclude_none=True) for c in config.contents])
+        name = f"cachedContents/fake-{self.caches_created}"
+        self.caches_created += 1
+        self.caches_by_name[name] = tokens
+        self.sent_tokens += tokens
+        self.billed_tokens += tokens  # creating a cache is billed as normal input once
+        return SimpleNamespace(name=name)
+
+    def delete_cache(self, name: str):
+        self.caches_by_name.pop(name, None)
+
+def run_interview(fake: FakeCachingGemini, session_id) -> None:
+    service = LLMService(client=fake, config=LLMConfig(), prompt_cache=PromptCache(fake))
+    history: List[Dict[str, str]] = []
+
+    for turn in range(TURNS):
+        answer = " ".join([f"answer{turn}"] * ANSWER_WORDS)
+        context = "\n\n---\n\n".join(" ".join([f"chunk{turn}-{i}"] * 150) for i in range(CONTEXT_CHUNKS))
+        contents = LLMConfig.build_prompt_contents(service.config, answer, context_text=context, past_messages=history)
+
+        reply = service.complete(contents, prefix_len=1 + len(history), session_id=session_id).text
+        history += [{"role": "user", "content": answer}, {"role": "assistant", "content": reply}]
+
+def main():
+    runs = [
+        ("no caching", FakeCachingGemini(), None),
+        ("prefix cache", FakeCachingGemini(), "sess_sim"),
+        ("unsupported", FakeCachingGemini(supports_caching=False), "sess_sim"),
+    ]
+
+    print(f"{TURNS}-turn interview\n")
+    baseline = None
+    for label, fake, session_id in runs:
+        run_interview(fake, session_id)
+        baseline = baseline or fake
+        print(
+            f"{label:<13} calls {fake.calls:>3}  caches created {fake.caches_created:>2}  "
+            f"sent {fake.sent_tokens:>8,} tokens ({fake.sent_tokens / baseline.sent_tokens:5.0%})  "
+            f"billed {fake.billed_tokens:>10,.0f} ({fake.billed_tokens / baseline.billed_tokens:5.0%})"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# backend/scripts/simulate_upstream_governor.py
+#
+# Simulation harness for app/services/upstream_governor.py.
+# A fake upstream with a fixed concurrency quota answers 429 whenever it's exceeded (like Gemini does),
+# and gets slower as it fills up. Halfway through, the quota drops to simulate another tenant taking
+# capacity. The same bursty load is run once with direct calls and once through the governor.
+#
+# Run from backend/:  python -m scripts.simulate_upstream_governor
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.upstream_governor import UpstreamGovernor, UpstreamOverloaded, UpstreamTimeout
+
+# --------- CONFIG ---------
+CLIENTS = 48            # concurrent callers in the burst
+CALLS_PER_CLIENT = 10
+QUOTA_START = 8         # upstream concurrency quota
+QUOTA_AFTER_DROP = 3
+DROP_AFTER_SEC = 1.5
+BASE_LATENCY = 0.05     # seconds per call at zero load
+DEADLINE = 5.0
+# ---------------------------
+
+class FakeAPIError(Exception):
+    """Shaped like google.genai.errors.APIError (status on .code)."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeUpstream:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def quota(self) -> int:
+        elapsed = time.monotonic() - self.started_at
+        return QUOTA_START if elapsed < DROP_AFTER_SEC else QUOTA_AFTER_DROP
+
+    def call(self, timeout: float = DEADLINE) -> str:
+        with self.lock:
+            if self.in_flight >= self.quota():
+                self.throttled += 1
+                raise FakeAPIError(429, "RESOURCE_EXHAUSTED")
+            self.in_flight += 1
+            load = self.in_flight / self.quota()
+        try:
+            time.sleep(min(timeout, BASE_LATENCY * (1 + load)))
+            return "ok"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+def run(label: str, make_call) -> None:
+    outcomes = {"ok": 0, "throttled": 0, "shed": 0, "timeout": 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(CALLS_PER_CLIENT):
+            t0 = time.monotonic()
+            try:
+                make_call()
+                outcome = "ok"
+            except UpstreamOverloaded:
+                outcome = "shed"
+            except UpstreamTimeout:
+                outcome = "timeout"
+            except FakeAPIError:
+                outcome = "throttled"
+            with lock:
+                outcomes[outcome] += 1
+                if outcome == "ok":
+                    latencies.append(time.monotonic() - t0)
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        for _ in range(CLIENTS):
+            pool.submit(client)
+    elapsed = time.monotonic() - t0
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    total = CLIENTS * CALLS_PER_CLIENT
+    print(
+        f"{label:<16} ok {outcomes['ok']:>4}/{total}  429s seen by caller {outcomes['throttled']:>4}  "
+        f"shed {outcomes['shed']:>3}  timeouts {outcomes['timeout']:>3}  "
+        f"p50 {p50:6.0f} ms  p95 {p95:6.0f} ms  wall {elapsed:5.2f}s"
+    )
+
+def main():
+    print(f"{CLIENTS} clients x {CALLS_PER_CLIENT} calls, quota {QUOTA_START} -> {QUOTA_AFTER_DROP} after {DROP_AFTER_SEC}s\n")
+
+    upstream = FakeUpstream()
+    run("direct", upstream.call)
+    print(f"{'':<16} upstream returned {upstream.throttled} x 429")
+
+    upstream = FakeUpstream()
+    governor = UpstreamGovernor(
+        model_limits={"fake": {"initial": 4, "max_limit": 16, "latency_target": BASE_LATENCY * 4}},
+        max_queue=CLIENTS,
+        base_backoff=0.05,
+        max_backoff=1.0,
+        default_deadline=DEADLINE,
+    )
+    run("governed", lambda: governor.call("fake", upstream.call))
+    print(f"{'':<16} upstream returned {upstream.throttled} x 429, final limit {governor.limiter('fake').limit:.1f}")
+
+if __name__ == "__main__":
+    main()